@@ -0,0 +1,118 @@
+import time
+import queue
+import logging
+import threading
+from settings import *
+
+log = logging.getLogger(__name__)
+
+
+class AutoSave:
+    # saves the chunks edited since the last save every AUTOSAVE_INTERVAL seconds. The voxels
+    # of the modified chunks are copied on the main thread, and written to the region files
+    # by a background thread, so a save never blocks the frame
+    def __init__(self, world, interval=AUTOSAVE_INTERVAL):
+        self.app = world.app
+        self.chunks = world.chunks
+        self.voxels = world.voxels
+        self.regions = world.regions
+        self.interval = interval
+        self.last_save = self.app.time
+
+        # saved voxels not yet in the region files: position -> voxels
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+
+        # stats of the writes, times in ms, written by the writer thread under the lock
+        self.num_flushes = 0
+        self.num_failed = 0
+        self.last_bytes = 0
+        self.last_time = 0.0
+        self.total_bytes = 0
+        self.total_time = 0.0
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def update(self):
+        if self.app.time - self.last_save >= self.interval:
+            self.last_save = self.app.time
+            self.save(self.chunks)
+
+    def save(self, chunks):
+        # queues the modified chunks for the writer thread
+        saved = {}
+        for chunk in chunks:
+            if chunk.is_modified:
+                saved[chunk.position] = self.voxels.get_chunk(chunk.index)
+                chunk.is_modified = False
+
+        if saved:
+            with self.lock:
+                self.pending.update(saved)
+            self.queue.put(saved)
+
+    def get_pending(self, position):
+        # voxels of a chunk saved but not yet written, e.g. when it comes back into the window
+        with self.lock:
+            return self.pending.get(position)
+
+    def run(self):
+        # chunks of a failed write stay pending and are written again with the next save,
+        # or after the interval if there is none
+        failed = {}
+        while True:
+            try:
+                chunks = self.queue.get(timeout=self.interval if failed else None)
+            except queue.Empty:
+                chunks = {}
+            is_closing = chunks is None
+            chunks = {**failed, **(chunks or {})}
+            if chunks:
+                failed = self.write(chunks)
+            if is_closing:
+                break
+
+    def write(self, chunks):
+        # returns the chunks that couldn't be written
+        start = time.perf_counter()
+        try:
+            num_bytes = self.regions.write_chunks(chunks)
+        except Exception:
+            log.exception('autosave of %d chunks failed, they are written again later', len(chunks))
+            with self.lock:
+                self.num_failed += 1
+            return chunks
+        write_time = (time.perf_counter() - start) * 1000
+
+        with self.lock:
+            for position, chunk_voxels in chunks.items():
+                # unless it was saved again in the meantime
+                if self.pending.get(position) is chunk_voxels:
+                    del self.pending[position]
+
+            self.num_flushes += 1
+            self.last_bytes, self.last_time = num_bytes, write_time
+            self.total_bytes += num_bytes
+            self.total_time += write_time
+        return {}
+
+    def close(self):
+        # saves the remaining modified chunks and waits for the writer thread
+        self.save(self.chunks)
+        self.queue.put(None)
+        self.thread.join()
+
+    def get_stats(self):
+        # sizes in MB
+        with self.lock:
+            return {
+                'num_flushes': self.num_flushes,
+                'num_failed': self.num_failed,
+                'last_size': self.last_bytes / 2 ** 20,
+                'last_time': self.last_time,
+                'total_size': self.total_bytes / 2 ** 20,
+                'total_time': self.total_time,
+                'num_pending': len(self.pending),
+            }
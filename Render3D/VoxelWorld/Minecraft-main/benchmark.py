@@ -0,0 +1,493 @@
+"""
+Benchmarks of the voxel engine, run from the project folder:
+
+    python benchmark.py              # all benchmarks
+    python benchmark.py generation   # only the named ones
+"""
+import os
+import sys
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import numba
+import pygame as pg
+import moderngl as mgl
+from types import SimpleNamespace
+from settings import *
+from camera import Camera
+from shader_program import ShaderProgram
+from meshes.chunk_arena import ChunkArena
+from terrain_gen import generate_chunks, generate_terrain
+from heightmaps import HeightMaps
+from voxel_store import VoxelStore
+from ray_cast import cast_ray, cast_rays, HIT_SIZE
+from meshes.chunk_mesh_builder import (
+    CHUNK_MESHERS, build_chunk_mesh, get_mesh_data, get_lod_data, get_padded_voxels, get_padded_index, is_void,
+    get_face_data
+)
+
+
+def get_window_chunks():
+    # chunk indices and positions of the window around the spawn point
+    chunk_indices = np.arange(WORLD_VOL)
+    chunk_positions = np.array([
+        (i % WORLD_W, i // WORLD_AREA, i // WORLD_W % WORLD_D) for i in chunk_indices
+    ])
+    return chunk_indices, chunk_positions
+
+
+def generate_window():
+    # voxel store of the window and the chunk positions
+    voxels = np.empty([WORLD_VOL, CHUNK_VOL], dtype='uint8')
+    chunk_indices, chunk_positions = get_window_chunks()
+    columns = [(cx, cz) for cx, _, cz in chunk_positions[:WORLD_AREA].tolist()]
+
+    heightmaps = np.array(HeightMaps().get_heightmaps(columns))
+    generate_chunks(voxels, chunk_indices, chunk_positions, heightmaps, chunk_indices % WORLD_AREA)
+
+    store = VoxelStore()
+    for chunk_index in chunk_indices:
+        store.set_chunk(chunk_index, voxels[chunk_index])
+    return store, chunk_positions
+
+
+def get_inner_chunks(chunk_positions):
+    # the chunks of the window that get a mesh
+    return [
+        (i, (cx, cy, cz)) for i, (cx, cy, cz) in enumerate(chunk_positions.tolist())
+        if 0 < cx < WORLD_W - 1 and 0 < cz < WORLD_D - 1
+    ]
+
+
+def bench_generation():
+    print(f'terrain generation of {WORLD_VOL} chunks')
+    voxels = np.empty([WORLD_VOL, CHUNK_VOL], dtype='uint8')
+    chunk_indices, chunk_positions = get_window_chunks()
+    heightmap_indices = chunk_indices % WORLD_AREA
+    columns = [(cx, cz) for cx, _, cz in chunk_positions[:WORLD_AREA].tolist()]
+
+    # compilation
+    heightmaps = np.array(HeightMaps().get_heightmaps(columns[:1]))
+    generate_chunks(voxels, chunk_indices[:1], chunk_positions[:1], heightmaps, heightmap_indices[:1])
+
+    single_time = None
+    for num_threads in range(1, numba.config.NUMBA_NUM_THREADS + 1):
+        numba.set_num_threads(num_threads)
+        start = time.perf_counter()
+        heightmaps = np.array(HeightMaps().get_heightmaps(columns))
+        generate_chunks(voxels, chunk_indices, chunk_positions, heightmaps, heightmap_indices)
+        gen_time = time.perf_counter() - start
+
+        single_time = single_time or gen_time
+        print(f'  threads: {num_threads:3}   time: {gen_time:7.3f} s   speedup: {single_time / gen_time:5.2f}x')
+
+
+def bench_determinism():
+    print('terrain generation in parallel, serially and one chunk at a time, in any order')
+    chunk_indices, chunk_positions = get_window_chunks()
+    heightmap_indices = chunk_indices % WORLD_AREA
+    columns = [(cx, cz) for cx, _, cz in chunk_positions[:WORLD_AREA].tolist()]
+    heightmaps = np.array(HeightMaps().get_heightmaps(columns))
+
+    parallel = np.empty([WORLD_VOL, CHUNK_VOL], dtype='uint8')
+    generate_chunks(parallel, chunk_indices, chunk_positions, heightmaps, heightmap_indices)
+
+    serial = np.zeros([WORLD_VOL, CHUNK_VOL], dtype='uint8')
+    for chunk_index in chunk_indices:
+        cx, cy, cz = chunk_positions[chunk_index] * CHUNK_SIZE
+        generate_terrain(serial[chunk_index], cx, cy, cz, heightmaps[heightmap_indices[chunk_index]], CAVE_NOISE_STEP)
+
+    single = np.empty([WORLD_VOL, CHUNK_VOL], dtype='uint8')
+    for chunk_index in np.random.default_rng().permutation(chunk_indices):
+        i = slice(chunk_index, chunk_index + 1)
+        generate_chunks(single[i], chunk_indices[:1], chunk_positions[i], heightmaps, heightmap_indices[i])
+
+    assert np.array_equal(parallel, serial), 'serial generation differs'
+    assert np.array_equal(parallel, single), 'single chunk generation differs'
+    print(f'  {WORLD_VOL} chunks identical, {np.count_nonzero(parallel == WOOD)} wood voxels')
+
+
+def bench_caves():
+    print('cave noise sampled at every voxel vs on a lattice every cave_step voxels')
+    chunk_indices, chunk_positions = get_window_chunks()
+    heightmap_indices = chunk_indices % WORLD_AREA
+    columns = [(cx, cz) for cx, _, cz in chunk_positions[:WORLD_AREA].tolist()]
+    heightmaps = np.array(HeightMaps().get_heightmaps(columns))
+
+    for cave_step in (1, 2, 4, 8):
+        voxels = np.empty([WORLD_VOL, CHUNK_VOL], dtype='uint8')
+        # compilation
+        generate_chunks(voxels[:1], chunk_indices[:1], chunk_positions[:1], heightmaps, heightmap_indices[:1], cave_step)
+
+        start = time.perf_counter()
+        generate_chunks(voxels, chunk_indices, chunk_positions, heightmaps, heightmap_indices, cave_step)
+        gen_time = time.perf_counter() - start
+
+        if cave_step == 1:
+            full_voxels, full_time = voxels, gen_time
+        num_changed = np.count_nonzero((voxels != 0) != (full_voxels != 0))
+        print(f'  step: {cave_step}   time: {gen_time:7.3f} s   speedup: {full_time / gen_time:5.2f}x'
+              f'   voxels changed: {num_changed / np.count_nonzero(full_voxels):6.2%}')
+
+        if cave_step == CAVE_NOISE_STEP:
+            path = save_cave_diff(full_voxels, voxels, chunk_positions)
+            print(f'  diff of a slice through the window for step {cave_step}: {path}')
+
+
+def save_cave_diff(full_voxels, voxels, chunk_positions, scale=2):
+    # vertical slice through the middle of the window: solid voxels grey, voxels solid
+    # only at full resolution red, solid only with the lattice noise blue
+    image = np.zeros([WORLD_W * CHUNK_SIZE, WORLD_H * CHUNK_SIZE, 3], dtype='uint8')
+    for chunk_index, (cx, cy, cz) in enumerate(chunk_positions.tolist()):
+        if cz != WORLD_D // 2:
+            continue
+        # chunk voxels are indexed [y, z, x]
+        full = full_voxels[chunk_index].reshape(CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)[:, H_CHUNK_SIZE].T != 0
+        lattice = voxels[chunk_index].reshape(CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)[:, H_CHUNK_SIZE].T != 0
+        pixels = image[cx * CHUNK_SIZE:(cx + 1) * CHUNK_SIZE, cy * CHUNK_SIZE:(cy + 1) * CHUNK_SIZE]
+        pixels[full & lattice] = 128, 128, 128
+        pixels[full & ~lattice] = 255, 0, 0
+        pixels[~full & lattice] = 0, 96, 255
+
+    surface = pg.surfarray.make_surface(image[:, ::-1].repeat(scale, 0).repeat(scale, 1))
+    path = os.path.join(tempfile.gettempdir(), 'cave_noise_diff.png')
+    pg.image.save(surface, path)
+    return path
+
+
+def bench_greedy():
+    print(f'greedy and binary meshing of the window, seed {SEED}')
+    voxels, chunk_positions = generate_window()
+
+    for name, builder in CHUNK_MESHERS.items():
+        # compilation
+        get_mesh_data(builder, get_padded_voxels(voxels.get_chunk(0), (0, 0, 0), voxels.arrays), 1)
+
+        num_vertices = 0
+        start = time.perf_counter()
+        for chunk_index, chunk_pos in get_inner_chunks(chunk_positions):
+            padded_voxels = get_padded_voxels(voxels.get_chunk(chunk_index), chunk_pos, voxels.arrays)
+            num_vertices += len(get_mesh_data(builder, padded_voxels, 1))
+        mesh_time = time.perf_counter() - start
+
+        if name == 'default':
+            default_vertices = num_vertices
+        print(f'  {name:8}  vertices: {num_vertices:10}  ({num_vertices / default_vertices:6.1%})'
+              f'  time: {mesh_time:7.3f} s')
+
+
+def bench_culling():
+    print('frustum culling, per chunk vs one pass over the chunk table')
+    camera = Camera(PLAYER_POS, yaw=-90, pitch=0)
+    camera.update()
+    num_frames = 20
+
+    for chunk_radius in (9, 16, 32, 64):
+        world_w = 2 * chunk_radius + 2
+        positions = np.array([
+            (x, y, z) for x in range(world_w) for y in range(WORLD_H) for z in range(world_w)
+        ])
+        centers = ((positions - (world_w // 2, 0, world_w // 2) + 0.5) * CHUNK_SIZE).astype('float32')
+        centers += np.array(camera.position) * (1, 0, 1)
+        is_drawable = np.ones(len(centers), dtype='bool')
+        chunks = [SimpleNamespace(center=glm.vec3(center)) for center in centers.tolist()]
+
+        start = time.perf_counter()
+        for _ in range(num_frames):
+            [chunk for chunk in chunks if camera.frustum.is_on_frustum(chunk)]
+        loop_time = (time.perf_counter() - start) / num_frames
+
+        camera.frustum.get_visible_chunks(centers, is_drawable)
+        start = time.perf_counter()
+        for _ in range(num_frames):
+            camera.frustum.get_visible_chunks(centers, is_drawable)
+        table_time = (time.perf_counter() - start) / num_frames
+
+        print(f'  radius: {chunk_radius:3}   chunks: {len(chunks):6}   per chunk: {loop_time * 1000:8.3f} ms'
+              f'   table: {table_time * 1000:7.3f} ms   speedup: {loop_time / table_time:6.1f}x')
+
+
+def bench_voxel_store():
+    print('voxel storage of the window, dense vs palette compressed')
+    voxels, chunk_positions = generate_window()
+    stats = voxels.get_stats()
+    print(f"  dense: {stats['dense_size']:8.2f} MB   stored: {stats['pool_used']:8.2f} MB"
+          f"   ({stats['pool_used'] / stats['dense_size']:6.1%})")
+    print('  chunks: ' + '   '.join(f"{bits} bit: {stats[f'{bits}_bit_chunks']}" for bits in (0, 1, 2, 4, 8)))
+
+    # the meshers read the neighbouring voxels through the store
+    chunk_index, chunk_pos = get_inner_chunks(chunk_positions)[0]
+    chunk_voxels = voxels.get_chunk(chunk_index)
+    get_padded_voxels(chunk_voxels, chunk_pos, voxels.arrays)
+
+    start = time.perf_counter()
+    for chunk_index, chunk_pos in get_inner_chunks(chunk_positions):
+        voxels.get_chunk(chunk_index)
+    unpack_time = time.perf_counter() - start
+    print(f'  unpacking the inner chunks: {unpack_time * 1000:7.1f} ms')
+
+
+def bench_lod():
+    print('level of detail meshes of the inner chunks of the window')
+    voxels, chunk_positions = generate_window()
+    # compilation
+    get_mesh_data(build_chunk_mesh, np.zeros(PADDED_SIZE ** 3, dtype='uint8'), 1)
+    get_lod_data(np.zeros(PADDED_SIZE ** 3, dtype='uint8'), 1, 1)
+
+    for lod in range(len(LOD_DISTANCES) + 1):
+        num_vertices = 0
+        start = time.perf_counter()
+        for chunk_index, chunk_pos in get_inner_chunks(chunk_positions):
+            padded_voxels = get_padded_voxels(voxels.get_chunk(chunk_index), chunk_pos, voxels.arrays)
+            if lod:
+                num_vertices += len(get_lod_data(padded_voxels, 1, lod))
+            else:
+                num_vertices += len(get_mesh_data(build_chunk_mesh, padded_voxels, 1))
+        mesh_time = time.perf_counter() - start
+
+        if not lod:
+            full_vertices = num_vertices
+        print(f'  {2 ** lod}x  vertices: {num_vertices:10}  ({num_vertices / full_vertices:6.1%})'
+              f'  time: {mesh_time:7.3f} s')
+
+
+@njit
+def count_void_neighbours(chunk_pos, world_voxels):
+    # the neighbour probes of the mesh builders, through the voxel store
+    cx, cy, cz = chunk_pos
+    count = 0
+    for y in range(CHUNK_SIZE):
+        for z in range(CHUNK_SIZE):
+            for x in range(CHUNK_SIZE):
+                wx, wy, wz = x + cx * CHUNK_SIZE, y + cy * CHUNK_SIZE, z + cz * CHUNK_SIZE
+                count += is_void((x, y + 1, z), (wx, wy + 1, wz), world_voxels)
+                count += is_void((x, y - 1, z), (wx, wy - 1, wz), world_voxels)
+                count += is_void((x + 1, y, z), (wx + 1, wy, wz), world_voxels)
+                count += is_void((x - 1, y, z), (wx - 1, wy, wz), world_voxels)
+                count += is_void((x, y, z + 1), (wx, wy, wz + 1), world_voxels)
+                count += is_void((x, y, z - 1), (wx, wy, wz - 1), world_voxels)
+    return count
+
+
+@njit
+def count_void_neighbours_padded(padded_voxels):
+    # the same probes, read from the padded voxels
+    count = 0
+    for y in range(CHUNK_SIZE):
+        for z in range(CHUNK_SIZE):
+            for x in range(CHUNK_SIZE):
+                voxel = get_padded_index(x, y, z)
+                count += padded_voxels[voxel + PADDED_AREA] == 0
+                count += padded_voxels[voxel - PADDED_AREA] == 0
+                count += padded_voxels[voxel + 1] == 0
+                count += padded_voxels[voxel - 1] == 0
+                count += padded_voxels[voxel + PADDED_SIZE] == 0
+                count += padded_voxels[voxel - PADDED_SIZE] == 0
+    return count
+
+
+def bench_padded():
+    print('neighbour probes of the inner chunks, voxel store lookups vs padded voxels')
+    voxels, chunk_positions = generate_window()
+    inner_chunks = get_inner_chunks(chunk_positions)
+
+    # compilation
+    chunk_index, chunk_pos = inner_chunks[0]
+    count_void_neighbours(chunk_pos, voxels.arrays)
+    padded_voxels = get_padded_voxels(voxels.get_chunk(chunk_index), chunk_pos, voxels.arrays)
+    count_void_neighbours_padded(padded_voxels)
+    get_mesh_data(build_chunk_mesh, padded_voxels, 1)
+
+    start = time.perf_counter()
+    store_count = sum(count_void_neighbours(chunk_pos, voxels.arrays) for _, chunk_pos in inner_chunks)
+    store_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    padded = [get_padded_voxels(voxels.get_chunk(chunk_index), chunk_pos, voxels.arrays)
+              for chunk_index, chunk_pos in inner_chunks]
+    padding_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    padded_count = sum(count_void_neighbours_padded(padded_voxels) for padded_voxels in padded)
+    padded_time = time.perf_counter() - start
+    assert store_count == padded_count
+
+    num_probes = 6 * CHUNK_VOL * len(inner_chunks)
+    print(f'  probes: {num_probes}   store: {store_time * 1000:8.1f} ms   padded: {padded_time * 1000:8.1f} ms'
+          f' + {padding_time * 1000:6.1f} ms to pad   speedup: {store_time / (padded_time + padding_time):5.1f}x')
+
+    start = time.perf_counter()
+    for padded_voxels in padded:
+        get_mesh_data(build_chunk_mesh, padded_voxels, 1)
+    print(f'  meshing the padded chunks: {(time.perf_counter() - start) * 1000:8.1f} ms')
+
+
+def bench_ray_cast():
+    print('ray casting in the window, one ray per call vs a batch')
+    voxels, chunk_positions = generate_window()
+    has_mesh = np.zeros(WORLD_VOL, dtype='bool')
+    has_mesh[[chunk_index for chunk_index, _ in get_inner_chunks(chunk_positions)]] = True
+
+    rng = np.random.default_rng(SEED)
+    num_rays = 100_000
+    # anywhere in the inner chunks, in random directions
+    origins = rng.uniform((1, 0, 1), (WORLD_W - 1, WORLD_H, WORLD_D - 1), (num_rays, 3)) * CHUNK_SIZE
+    directions = rng.normal(size=(num_rays, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+
+    for max_dist in (MAX_RAY_DIST, 64):
+        hit = np.zeros(HIT_SIZE, dtype='int64')
+        ends = origins + directions * max_dist
+        cast_ray(origins[0], ends[0], voxels.arrays, has_mesh, (0, 0), hit)
+        start = time.perf_counter()
+        for ray_start, ray_end in zip(origins, ends):
+            cast_ray(ray_start, ray_end, voxels.arrays, has_mesh, (0, 0), hit)
+        ray_time = time.perf_counter() - start
+
+        cast_rays(origins[:1], directions[:1], max_dist, voxels.arrays, has_mesh, (0, 0))
+        start = time.perf_counter()
+        _, _, voxel_ids = cast_rays(origins, directions, max_dist, voxels.arrays, has_mesh, (0, 0))
+        batch_time = time.perf_counter() - start
+
+        print(f'  rays: {num_rays}   length: {max_dist:3}   hits: {np.count_nonzero(voxel_ids):6}'
+              f'   per ray: {ray_time / num_rays * 1e6:6.2f} us   batch: {batch_time / num_rays * 1e6:6.3f} us')
+
+
+# a new process starting the engine up to its first frame, in a new world so that the start
+# chunks are generated and meshed, not loaded. Prints VoxelEngine.first_frame_time
+FIRST_FRAME = """
+import time
+start = time.perf_counter()
+import sys
+import settings
+settings.SAVE_DIR = sys.argv[1] + '/world'
+settings.MESH_CACHE_DIR = sys.argv[1] + '/mesh_cache'
+import main
+main.START_TIME = start
+app = main.VoxelEngine()
+app.handle_events()
+app.update()
+app.render()
+print(app.first_frame_time)
+"""
+
+
+def bench_cold_start():
+    print('new engine processes up to the first frame, without and with the kernel cache')
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+        for run in ('cold', 'warm'):
+            with tempfile.TemporaryDirectory() as save_dir:
+                result = subprocess.run([sys.executable, '-c', FIRST_FRAME, save_dir], cwd=project_dir, env=env,
+                                        check=True, capture_output=True, text=True)
+            # the last line, after the messages of pygame
+            print(f'  {run}:  time to first frame: {float(result.stdout.split()[-1]):7.3f} s')
+
+
+def bench_face_instancing():
+    print(f'chunk vbo of the inner chunks with 6 vertices vs a record per face, {CHUNK_MESHER} mesher')
+    voxels, chunk_positions = generate_window()
+    inner_chunks = get_inner_chunks(chunk_positions)
+    padded_voxels = [
+        get_padded_voxels(voxels.get_chunk(chunk_index), chunk_pos, voxels.arrays)
+        for chunk_index, chunk_pos in inner_chunks
+    ]
+    vertex_data = [get_mesh_data(CHUNK_MESHERS[CHUNK_MESHER], chunk_voxels, 1) for chunk_voxels in padded_voxels]
+    get_face_data(vertex_data[0])
+    start = time.perf_counter()
+    face_data = [get_face_data(chunk_data) for chunk_data in vertex_data]
+    print(f'  face records from the vertices: {(time.perf_counter() - start) * 1000:7.1f} ms')
+
+    # offscreen, looking down at the window from above its center
+    try:
+        ctx = mgl.create_standalone_context(require=330)
+    except Exception:
+        # without a display
+        ctx = mgl.create_standalone_context(require=330, backend='egl')
+    fbo = ctx.simple_framebuffer((int(WIN_RES.x) // 2, int(WIN_RES.y) // 2))
+    fbo.use()
+    ctx.enable(flags=mgl.DEPTH_TEST | mgl.CULL_FACE)
+    camera = Camera((WORLD_W * H_CHUNK_SIZE, WORLD_H * CHUNK_SIZE * 1.5, WORLD_D * CHUNK_SIZE), yaw=-90, pitch=-30)
+    camera.update()
+    shader_program = ShaderProgram(SimpleNamespace(ctx=ctx, player=camera))
+    shader_program.update()
+    app = SimpleNamespace(ctx=ctx, shader_program=shader_program)
+
+    origins = np.array([chunk_pos for _, chunk_pos in inner_chunks], dtype='float32') * CHUNK_SIZE
+    num_frames = 10
+    for mesh_format, data in (('vertices', vertex_data), ('faces', face_data)):
+        arena = ChunkArena(app, mesh_format)
+        sizes = np.array([len(chunk_data) for chunk_data in data], dtype='uint32')
+        firsts = (np.cumsum(sizes) - sizes).astype('uint32')
+
+        start = time.perf_counter()
+        arena.vbo.orphan(int(sizes.sum()) * arena.vertex_size)
+        arena.vbo.write(np.concatenate(data))
+        ctx.finish()
+        upload_time = time.perf_counter() - start
+
+        # first frame, compiles the shaders
+        arena.render(firsts, sizes, origins)
+        ctx.finish()
+        start = time.perf_counter()
+        for _ in range(num_frames):
+            ctx.clear(*BG_COLOR)
+            arena.render(firsts, sizes, origins)
+        ctx.finish()
+        frame_time = (time.perf_counter() - start) / num_frames
+
+        print(f'  {mesh_format:8}  vbo: {arena.vbo.size / 2 ** 20:7.2f} MB   upload: {upload_time * 1000:7.1f} ms'
+              f'   frame: {frame_time * 1000:8.2f} ms   fps: {1 / frame_time:7.1f}')
+        arena.vbo.release()
+    ctx.release()
+
+
+def bench_batch_mesher():
+    print(f'meshing the inner chunks of the window on a pool of threads, {CHUNK_MESHER} mesher')
+    voxels, chunk_positions = generate_window()
+    inner_chunks = get_inner_chunks(chunk_positions)
+
+    def mesh_chunk(inner_chunk):
+        # as ChunkMesh.build, with the GIL released by the kernels
+        chunk_index, chunk_pos = inner_chunk
+        padded_voxels = get_padded_voxels(voxels.get_chunk(chunk_index), chunk_pos, voxels.arrays)
+        return get_mesh_data(CHUNK_MESHERS[CHUNK_MESHER], padded_voxels, 1)
+
+    # compilation
+    mesh_chunk(inner_chunks[0])
+
+    single_time = None
+    for num_threads in range(1, MESH_THREADS + 1):
+        with ThreadPoolExecutor(num_threads) as pool:
+            start = time.perf_counter()
+            vertex_data = list(pool.map(mesh_chunk, inner_chunks))
+            counts = np.array([len(chunk_data) for chunk_data in vertex_data])
+            np.concatenate(vertex_data)
+            mesh_time = time.perf_counter() - start
+
+        single_time = single_time or mesh_time
+        print(f'  threads: {num_threads:3}   chunks: {len(inner_chunks)}   vertices: {counts.sum():10}'
+              f'   time: {mesh_time:7.3f} s   speedup: {single_time / mesh_time:5.2f}x')
+
+
+BENCHMARKS = {
+    'generation': bench_generation,
+    'determinism': bench_determinism,
+    'caves': bench_caves,
+    'greedy': bench_greedy,
+    'culling': bench_culling,
+    'voxel_store': bench_voxel_store,
+    'lod': bench_lod,
+    'padded': bench_padded,
+    'ray_cast': bench_ray_cast,
+    'cold_start': bench_cold_start,
+    'face_instancing': bench_face_instancing,
+    'batch_mesher': bench_batch_mesher,
+}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
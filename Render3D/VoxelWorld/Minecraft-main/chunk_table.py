@@ -0,0 +1,27 @@
+from settings import *
+from occlusion import ALL_CONNECTED
+
+
+class ChunkTable:
+    # the chunk data needed every frame as a structure of arrays, indexed by the chunk index,
+    # so that culling and batching the draw calls work on whole arrays
+    def __init__(self, size=WORLD_VOL):
+        self.centers = np.zeros([size, 3], dtype='float32')
+        self.origins = np.zeros([size, 3], dtype='float32')
+        self.is_empty = np.ones(size, dtype='bool')
+
+        # range of the chunk mesh in the chunk arena, no vertices without a mesh
+        self.firsts = np.zeros(size, dtype='uint32')
+        self.num_vertices = np.zeros(size, dtype='uint32')
+        # chunks with a mesh, the ones whose voxels can be edited
+        self.has_mesh = np.zeros(size, dtype='bool')
+
+        # faces of the chunk connected through its air, all of them until the chunk is meshed
+        self.connections = np.full(size, ALL_CONNECTED, dtype='int64')
+
+    def set_position(self, index, position):
+        self.origins[index] = glm.vec3(position) * CHUNK_SIZE
+        self.centers[index] = self.origins[index] + H_CHUNK_SIZE
+
+    def get_drawable(self):
+        return ~self.is_empty & (self.num_vertices > 0)
@@ -33,3 +33,20 @@ class Frustum:
             return False
 
         return True
+
+    def get_visible_chunks(self, centers, is_drawable):
+        # indices of the drawable chunks on the frustum
+        return np.flatnonzero(is_drawable & self.get_on_frustum(centers))
+
+    def get_on_frustum(self, centers):
+        # is_on_frustum for all chunk centers at once
+        sphere_vecs = centers - np.array(self.cam.position)
+
+        sz = sphere_vecs @ np.array(self.cam.forward)
+        sy = sphere_vecs @ np.array(self.cam.up)
+        sx = sphere_vecs @ np.array(self.cam.right)
+
+        on_frustum = (NEAR - CHUNK_SPHERE_RADIUS <= sz) & (sz <= FAR + CHUNK_SPHERE_RADIUS)
+        on_frustum &= np.abs(sy) <= self.factor_y * CHUNK_SPHERE_RADIUS + sz * self.tan_y
+        on_frustum &= np.abs(sx) <= self.factor_x * CHUNK_SPHERE_RADIUS + sz * self.tan_x
+        return on_frustum
@@ -0,0 +1,35 @@
+from collections import OrderedDict
+from settings import *
+from terrain_gen import generate_heightmaps
+
+
+class HeightMaps:
+    # surface heights of chunk columns, computed once and shared by all the chunks
+    # stacked in the column. The least recently used columns are evicted first
+    def __init__(self, capacity=HEIGHTMAP_CACHE_SIZE):
+        self.capacity = capacity
+        self.cache = OrderedDict()
+
+    def get_heightmaps(self, columns):
+        # the missing columns are generated in one parallel call
+        missing = [column for column in dict.fromkeys(columns) if column not in self.cache]
+        if missing:
+            heightmaps = np.empty([len(missing), CHUNK_SIZE, CHUNK_SIZE], dtype='int32')
+            generate_heightmaps(heightmaps, np.array(missing))
+            self.cache.update(zip(missing, heightmaps))
+
+        for column in columns:
+            self.cache.move_to_end(column)
+        heightmaps = [self.cache[column] for column in columns]
+
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return heightmaps
+
+    def get_heightmap(self, cx, cz):
+        return self.get_heightmaps([(cx, cz)])[0]
+
+    def get_height(self, x, z):
+        # surface height at the world voxel column x, z
+        cx, cz = x // CHUNK_SIZE, z // CHUNK_SIZE
+        return self.get_heightmap(cx, cz)[x - cx * CHUNK_SIZE, z - cz * CHUNK_SIZE]
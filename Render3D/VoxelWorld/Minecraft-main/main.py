@@ -1,12 +1,18 @@
+import time
+START_TIME = time.perf_counter()  # of the time to first frame, before the imports
+
 from settings import *
 import moderngl as mgl
 import pygame as pg
 import sys
+import logging
 from shader_program import ShaderProgram
 from scene import Scene
 from player import Player
 from textures import Textures
 
+log = logging.getLogger(__name__)
+
 
 class VoxelEngine:
     def __init__(self):
@@ -26,6 +32,7 @@ class VoxelEngine:
         self.clock = pg.time.Clock()
         self.delta_time = 0
         self.time = 0
+        self.first_frame_time = None  # s from the start to the first frame on screen
 
         pg.event.set_grab(True)
         pg.mouse.set_visible(False)
@@ -46,12 +53,20 @@ class VoxelEngine:
 
         self.delta_time = self.clock.tick()
         self.time = pg.time.get_ticks() * 0.001
-        pg.display.set_caption(f'{self.clock.get_fps() :.0f}')
+        caption = f'{self.clock.get_fps() :.0f}'
+        # loading progress of a fast start
+        progress = self.scene.world.get_loading_progress()
+        if progress < 1 and self.first_frame_time:
+            caption += f'   loading {progress :.0%}   first frame {self.first_frame_time :.2f} s'
+        pg.display.set_caption(caption)
 
     def render(self):
         self.ctx.clear(color=BG_COLOR)
         self.scene.render()
         pg.display.flip()
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter() - START_TIME
+            log.info('first frame after %.2f s', self.first_frame_time)
 
     def handle_events(self):
         for event in pg.event.get():
@@ -64,10 +79,12 @@ class VoxelEngine:
             self.handle_events()
             self.update()
             self.render()
+        self.scene.world.save()
         pg.quit()
         sys.exit()
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     app = VoxelEngine()
     app.run()
@@ -0,0 +1,56 @@
+from settings import *
+from concurrent.futures import ThreadPoolExecutor
+from meshes.chunk_mesh import ChunkMesh
+
+
+class BatchMesher:
+    # meshes the chunks loaded together, e.g. at the start or after a teleport, on a pool
+    # of threads. The mesh kernels release the GIL and every thread has its own scratch
+    # buffers, so the chunks are meshed on all cores. The meshes are then uploaded to the
+    # chunk arena with one write
+    def __init__(self, world, num_threads=MESH_THREADS):
+        self.world = world
+        self.arena = world.chunk_arena
+        self.pool = ThreadPoolExecutor(num_threads) if num_threads > 1 else None
+
+    def mesh_chunks(self, chunk_indices):
+        # the new meshes of the chunks, their face connections, their vertex data concatenated,
+        # and the offset and number of vertices of each mesh in it
+        chunks = [self.world.chunks[chunk_index] for chunk_index in chunk_indices]
+        for chunk in chunks:
+            # before the new mesh takes over the entries of the chunk in the chunk table
+            chunk.release_mesh()
+
+        meshes = [ChunkMesh(chunk, self.world.get_lod(chunk.position)) for chunk in chunks]
+        if self.pool and len(meshes) > 1:
+            connections = list(self.pool.map(ChunkMesh.build, meshes))
+        else:
+            connections = [mesh.build() for mesh in meshes]
+
+        counts = np.array([sum(len(vertex_data) for vertex_data in mesh.slabs) for mesh in meshes], dtype='int64')
+        offsets = np.cumsum(counts) - counts
+        vertex_data = np.concatenate(
+            [vertex_data for mesh in meshes for vertex_data in mesh.slabs] or [np.empty(0, dtype=self.arena.dtype)]
+        )
+        return meshes, connections, vertex_data, offsets, counts
+
+    def build_meshes(self, chunk_indices):
+        if not chunk_indices:
+            return
+
+        meshes, connections, vertex_data, offsets, counts = self.mesh_chunks(chunk_indices)
+        # the results of the threads are written on the main thread
+        self.world.chunk_table.connections[chunk_indices] = connections
+        if self.world.mesh_cache:
+            num_hits = sum(mesh.is_cached for mesh in meshes)
+            self.world.mesh_cache.count(num_hits, len(meshes) - num_hits)
+        if self.arena.upload_batch(meshes, vertex_data, offsets, counts):
+            for mesh, num_vertices in zip(meshes, counts.tolist()):
+                mesh.num_vertices = num_vertices
+        else:
+            # no room for all of them, the meshes are allocated one by one
+            for mesh in meshes:
+                mesh.upload()
+
+        for mesh in meshes:
+            mesh.chunk.set_mesh(mesh)
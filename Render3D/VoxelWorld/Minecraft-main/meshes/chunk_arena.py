@@ -0,0 +1,194 @@
+from settings import *
+from range_allocator import RangeAllocator
+
+
+class ChunkArena:
+    # one large vbo shared by the meshes of all chunks, each mesh is a range of it.
+    # When no free range is large enough the live ranges are compacted, and the vbo
+    # grows by orphaning up to CHUNK_ARENA_MAX_SIZE
+    def __init__(self, app, mesh_format=CHUNK_MESH_FORMAT):
+        self.ctx = app.ctx
+        # face records are instances of a quad of 6 vertices, the sizes and ranges of
+        # the arena are then counted in faces
+        self.is_instanced = mesh_format == 'faces'
+        if self.is_instanced:
+            self.program = app.shader_program.chunk_faces
+            self.vbo_format = '2u4/i'
+            self.attrs = ('face_data',)
+            self.vertex_size = 8  # bytes
+            self.dtype = 'uint64'
+            self.mesh_slack = CHUNK_MESH_SLACK // 6
+        else:
+            self.program = app.shader_program.chunk
+            self.vbo_format = '1u4'
+            self.attrs = ('packed_data',)
+            self.vertex_size = 4
+            self.dtype = 'uint32'
+            self.mesh_slack = CHUNK_MESH_SLACK
+
+        # all visible chunks are drawn with one multi-draw call if the context supports it (GL 4.3,
+        # drivers usually give a newer context than the 3.3 asked for), otherwise with a draw call
+        # per chunk. Both upload the origins of all the chunks once per frame
+        self.is_batched = self.ctx.version_code >= 430
+
+        # sizes in vertices
+        self.max_capacity = CHUNK_ARENA_MAX_SIZE * 2 ** 20 // self.vertex_size
+        self.allocator = RangeAllocator(CHUNK_ARENA_SIZE * 2 ** 20 // self.vertex_size)
+        self.meshes = set()
+
+        self.vbo = self.ctx.buffer(reserve=self.allocator.capacity * self.vertex_size)
+        # chunk origins are per instance attributes, each draw command selects its
+        # origin with the base instance. The base instance of the face instanced draws
+        # selects their faces instead, so their origins are per vertex, 6 per draw
+        # and selected with the first vertex
+        self.origins_format = '3f' if self.is_instanced else '3f/i'
+        self.origins = self.ctx.buffer(reserve=WORLD_VOL * 6 * 3 * 4)
+        # draw commands: vertices, instances, first vertex, base instance and
+        # padding, as moderngl reads the commands with a stride of 20 bytes
+        self.commands = self.ctx.buffer(reserve=WORLD_VOL * 5 * 4)
+        self.vao = self.ctx.vertex_array(
+            self.program, [
+                (self.vbo, self.vbo_format, *self.attrs),
+                (self.origins, self.origins_format, 'in_chunk_origin')
+            ], skip_errors=True
+        )
+
+        self.num_defrags = 0
+        self.num_grows = 0
+        self.num_failed = 0
+
+    def alloc(self, mesh, size):
+        # gives the mesh a range of size vertices: mesh.first, mesh.size
+        first = self.allocator.alloc(size)
+        if first == -1 and self.compact(size):
+            first = self.allocator.alloc(size)
+
+        if first == -1:
+            # the arena is full, the mesh isn't rendered
+            self.num_failed += 1
+            mesh.first, mesh.size = 0, 0
+            return False
+
+        mesh.first, mesh.size = first, size
+        self.meshes.add(mesh)
+        return True
+
+    def free(self, mesh):
+        if mesh in self.meshes:
+            self.meshes.remove(mesh)
+            self.allocator.free(mesh.first, mesh.size)
+        mesh.first, mesh.size = 0, 0
+
+    def upload_batch(self, meshes, vertex_data, offsets, counts):
+        # gives the meshes consecutive ranges of one allocation with their slack, and writes
+        # their vertex data, concatenated at offsets, with one upload. False if there is no room
+        sizes = counts + self.mesh_slack
+        total = int(sizes.sum())
+        first = self.allocator.alloc(total)
+        if first == -1 and self.compact(total):
+            first = self.allocator.alloc(total)
+        if first == -1:
+            return False
+
+        # the ranges are freed one by one, the allocator merges them again
+        firsts = np.cumsum(sizes) - sizes
+        for mesh, mesh_first, size in zip(meshes, (first + firsts).tolist(), sizes.tolist()):
+            mesh.first, mesh.size = mesh_first, size
+            self.meshes.add(mesh)
+
+        data = np.zeros(total, dtype=self.dtype)
+        data[np.repeat(firsts - offsets, counts) + np.arange(len(vertex_data))] = vertex_data
+        self.vbo.write(data, offset=first * self.vertex_size)
+        return True
+
+    def write(self, mesh, vertex_data, offset=0):
+        # offset in vertices from the start of the range of the mesh
+        self.vbo.write(vertex_data, offset=(mesh.first + offset) * self.vertex_size)
+
+    def compact(self, size):
+        # moves the live ranges to the start of the vbo, growing it if there still
+        # isn't room for size vertices. The vertex data comes from the meshes
+        used = self.allocator.used
+        capacity = self.allocator.capacity
+        if used + size > capacity:
+            capacity = min(max(2 * capacity, used + size), self.max_capacity)
+            if used + size > capacity:
+                return False
+
+            # orphaning keeps the vbo and the vao, only the storage is reallocated
+            self.vbo.orphan(capacity * self.vertex_size)
+            self.num_grows += 1
+        else:
+            self.num_defrags += 1
+
+        first = 0
+        for mesh in sorted(self.meshes, key=lambda mesh: mesh.first):
+            mesh.first = first
+            self.write(mesh, mesh.get_vertex_data())
+            first += mesh.size
+
+        self.allocator.reset(capacity, used)
+        return True
+
+    def render(self, firsts, num_vertices, origins):
+        # draws the ranges of the chunk meshes at the chunk origins
+        num_draws = len(firsts)
+        if not num_draws:
+            return
+
+        if self.is_instanced:
+            self.render_instanced(firsts, num_vertices, origins)
+            return
+
+        if not self.is_batched:
+            # the origins are written once, each draw points the origin attribute at its own
+            self.origins.write(origins)
+            for i, (first, vertices) in enumerate(zip(firsts.tolist(), num_vertices.tolist())):
+                self.vao.bind(1, 'f', self.origins, '3f', offset=i * 3 * 4, divisor=1)
+                self.vao.render(first=first, vertices=vertices)
+            return
+
+        commands = np.zeros([num_draws, 5], dtype='uint32')
+        commands[:, 0] = num_vertices
+        commands[:, 1] = 1
+        commands[:, 2] = firsts
+        commands[:, 3] = np.arange(num_draws)
+
+        self.origins.write(origins)
+        self.commands.write(commands)
+        self.vao.render_indirect(self.commands, count=num_draws)
+
+    def render_instanced(self, firsts, num_faces, origins):
+        # a quad of 6 vertices per face of the ranges
+        num_draws = len(firsts)
+        self.origins.write(np.repeat(origins, 6, axis=0))
+        if not self.is_batched:
+            # without the base instance the face records of each draw are bound at its range
+            for i, (first, faces) in enumerate(zip(firsts.tolist(), num_faces.tolist())):
+                self.vao.bind(0, 'i', self.vbo, '2u4', offset=first * self.vertex_size, divisor=1)
+                self.vao.render(first=i * 6, vertices=6, instances=faces)
+            return
+
+        commands = np.zeros([num_draws, 5], dtype='uint32')
+        commands[:, 0] = 6
+        commands[:, 1] = num_faces
+        commands[:, 2] = np.arange(num_draws) * 6
+        commands[:, 3] = firsts
+
+        self.commands.write(commands)
+        self.vao.render_indirect(self.commands, count=num_draws)
+
+    def get_stats(self):
+        # memory in MB
+        to_mb = self.vertex_size / 2 ** 20
+        return {
+            'capacity': self.allocator.capacity * to_mb,
+            'allocated': self.allocator.used * to_mb,
+            'vertices': sum(mesh.num_vertices for mesh in self.meshes) * to_mb,
+            'num_meshes': len(self.meshes),
+            'num_free_ranges': len(self.allocator.free_ranges),
+            'largest_free': self.allocator.largest_free * to_mb,
+            'num_defrags': self.num_defrags,
+            'num_grows': self.num_grows,
+            'num_failed': self.num_failed,
+        }
@@ -1,28 +1,159 @@
+from settings import *
 from meshes.base_mesh import BaseMesh
-from meshes.chunk_mesh_builder import build_chunk_mesh
+from meshes.chunk_mesh_builder import CHUNK_MESHERS, get_slab_data, get_lod_data, get_padded_voxels, get_face_data
+from occlusion import get_face_connections, changes_connections, ALL_CONNECTED
 
 
 class ChunkMesh(BaseMesh):
-    def __init__(self, chunk):
+    def __init__(self, chunk, lod=0):
         super().__init__()
         self.app = chunk.app
         self.chunk = chunk
         self.ctx = self.app.ctx
-        self.program = self.app.shader_program.chunk
+        self.arena = chunk.world.chunk_arena
+        self.program = self.arena.program
 
-        self.vbo_format = '1u4'
-        self.format_size = sum(int(fmt[:1]) for fmt in self.vbo_format.split())
-        self.attrs = ('packed_data',)
-        self.vao = self.get_vao()
+        self.vbo_format = self.arena.vbo_format
+        # uint32 per vertex of the mesh builders, the face records are made from their quads
+        self.format_size = 1
+        self.attrs = self.arena.attrs
+
+        # range of the mesh in the arena vbo, first and num_vertices are kept in the chunk table
+        self.table = chunk.table
+        self.index = chunk.index
+        self.first = 0
+        self.size = 0
+        self.num_vertices = 0
+
+        # distant chunks are meshed downsampled by 2 ** lod, as a single slab
+        self.lod = lod
+        self.num_slabs = 1 if lod else CHUNK_SLABS
+
+        # vertex data of each slab, stored one after another in the arena range of the mesh
+        self.slabs = []
+        self.dirty_slabs = set()
+        # set by the edits that can change the face connections of the chunk
+        self.is_connection_dirty = False
+        # the slabs were loaded from the mesh cache
+        self.is_cached = False
+        # built and uploaded by the batch mesher, together with the other chunks loaded with it
+
+    @property
+    def first(self):
+        return int(self.table.firsts[self.index])
+
+    @first.setter
+    def first(self, first):
+        self.table.firsts[self.index] = first
+
+    @property
+    def num_vertices(self):
+        return int(self.table.num_vertices[self.index])
+
+    @num_vertices.setter
+    def num_vertices(self, num_vertices):
+        self.table.num_vertices[self.index] = num_vertices
+
+    def build(self):
+        # the slabs, from the mesh cache if the chunk is unchanged. Returns the face connections.
+        # Called from the threads of the batch mesher, so only the mesh itself is written, the
+        # connections go into the chunk table on the main thread
+        chunk_voxels = self.chunk.get_voxels()
+        padded_voxels = self.get_padded_voxels(chunk_voxels)
+        mesh_cache = self.chunk.world.mesh_cache
+        if mesh_cache:
+            key = mesh_cache.get_key(padded_voxels, self.lod)
+            cached = mesh_cache.load(key)
+            if cached:
+                self.slabs, connections = cached
+                self.is_cached = True
+                return connections
+
+        self.slabs = [self.get_slab_data(slab, padded_voxels) for slab in range(self.num_slabs)]
+        connections = get_face_connections(chunk_voxels)
+        if mesh_cache:
+            mesh_cache.save(key, self.slabs, connections)
+        return connections
+
+    def set_dirty(self, voxel_y):
+        if self.lod:
+            self.dirty_slabs.add(0)
+            return
+
+        # a voxel changes the faces and ao of the layers next to it
+        for y in (voxel_y - 1, voxel_y, voxel_y + 1):
+            if 0 <= y < CHUNK_SIZE:
+                self.dirty_slabs.add(y // CHUNK_SLAB_SIZE)
+
+    def set_edited(self, voxel_index):
+        # an edit of a voxel of the chunk itself, most edits leave its air regions connected
+        # the same way, so the flood fill of update_connections is skipped for them
+        if not self.is_connection_dirty:
+            self.is_connection_dirty = changes_connections(
+                self.chunk.world.voxels.get_data(self.index), voxel_index, self.table.connections[self.index]
+            )
 
     def rebuild(self):
-        self.vao = self.get_vao()
+        # remesh only the dirty slabs, or the whole chunk if none is marked
+        is_connection_dirty = self.is_connection_dirty or not self.dirty_slabs
+        dirty_slabs = self.dirty_slabs or set(range(self.num_slabs))
+        self.dirty_slabs = set()
+        self.is_connection_dirty = False
+        chunk_voxels = self.chunk.get_voxels()
+        padded_voxels = self.get_padded_voxels(chunk_voxels)
+        for slab in dirty_slabs:
+            self.slabs[slab] = self.get_slab_data(slab, padded_voxels)
+
+        # the slabs from the first dirty one on are written over the old ones in the range
+        first_slab = min(dirty_slabs)
+        offset = sum(len(vertex_data) for vertex_data in self.slabs[:first_slab])
+        num_vertices = sum(len(vertex_data) for vertex_data in self.slabs)
+
+        if num_vertices > self.size:
+            self.arena.free(self)
+            self.upload()
+        else:
+            self.arena.write(self, np.concatenate(self.slabs[first_slab:]), offset)
+            self.num_vertices = num_vertices
+        if is_connection_dirty:
+            self.update_connections(chunk_voxels)
+
+    def update_connections(self, chunk_voxels):
+        # for the occlusion culling
+        self.table.connections[self.index] = get_face_connections(chunk_voxels)
+
+    def upload(self):
+        # a new range with spare room for edits
+        vertex_data = self.get_vertex_data()
+        if self.arena.alloc(self, len(vertex_data) + self.arena.mesh_slack):
+            self.arena.write(self, vertex_data)
+            self.num_vertices = len(vertex_data)
+        else:
+            self.num_vertices = 0
+
+    def release(self):
+        self.arena.free(self)
+        self.num_vertices = 0
+        self.table.connections[self.index] = ALL_CONNECTED
+
+    def get_padded_voxels(self, chunk_voxels):
+        # snapshot of the chunk and the borders of its neighbours, meshed by the builders
+        return get_padded_voxels(chunk_voxels, self.chunk.position, self.chunk.world.voxels.arrays)
+
+    def get_slab_data(self, slab, padded_voxels):
+        if self.lod:
+            vertex_data = get_lod_data(padded_voxels, self.format_size, self.lod)
+        else:
+            vertex_data = get_slab_data(
+                builder=CHUNK_MESHERS[CHUNK_MESHER],
+                padded_voxels=padded_voxels,
+                format_size=self.format_size,
+                slab=slab
+            )
+
+        if self.arena.is_instanced:
+            return get_face_data(vertex_data)
+        return vertex_data
 
     def get_vertex_data(self):
-        mesh = build_chunk_mesh(
-            chunk_voxels=self.chunk.voxels,
-            format_size=self.format_size,
-            chunk_pos=self.chunk.position,
-            world_voxels=self.chunk.world.voxels
-        )
-        return mesh
+        return np.concatenate(self.slabs)
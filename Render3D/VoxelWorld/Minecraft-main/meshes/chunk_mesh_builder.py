@@ -1,41 +1,35 @@
 from settings import *
 from numba import uint8
+from voxel_store import get_voxel
+from occlusion import FACE_DIRS
+import threading
 
+# scratch vertex buffers of the mesh builders, one per thread
+scratch = threading.local()
 
-@njit
-def get_ao(local_pos, world_pos, world_voxels, plane):
-    x, y, z = local_pos
-    wx, wy, wz = world_pos
+# part of the mesh cache keys, to be increased when the builders change their vertex data
+MESHER_VERSION = 1
 
-    if plane == 'Y':
-        a = is_void((x    , y, z - 1), (wx    , wy, wz - 1), world_voxels)
-        b = is_void((x - 1, y, z - 1), (wx - 1, wy, wz - 1), world_voxels)
-        c = is_void((x - 1, y, z    ), (wx - 1, wy, wz    ), world_voxels)
-        d = is_void((x - 1, y, z + 1), (wx - 1, wy, wz + 1), world_voxels)
-        e = is_void((x    , y, z + 1), (wx    , wy, wz + 1), world_voxels)
-        f = is_void((x + 1, y, z + 1), (wx + 1, wy, wz + 1), world_voxels)
-        g = is_void((x + 1, y, z    ), (wx + 1, wy, wz    ), world_voxels)
-        h = is_void((x + 1, y, z - 1), (wx + 1, wy, wz - 1), world_voxels)
 
+@njit
+def get_ao(padded_voxels, voxel, plane):
+    # voxel is the padded index of the voxel in front of the face, the probes are the
+    # eight voxels around it in the plane of the face, u and v are their index steps
+    if plane == 'Y':
+        u, v = 1, PADDED_SIZE  # x, z
     elif plane == 'X':
-        a = is_void((x, y    , z - 1), (wx, wy    , wz - 1), world_voxels)
-        b = is_void((x, y - 1, z - 1), (wx, wy - 1, wz - 1), world_voxels)
-        c = is_void((x, y - 1, z    ), (wx, wy - 1, wz    ), world_voxels)
-        d = is_void((x, y - 1, z + 1), (wx, wy - 1, wz + 1), world_voxels)
-        e = is_void((x, y    , z + 1), (wx, wy    , wz + 1), world_voxels)
-        f = is_void((x, y + 1, z + 1), (wx, wy + 1, wz + 1), world_voxels)
-        g = is_void((x, y + 1, z    ), (wx, wy + 1, wz    ), world_voxels)
-        h = is_void((x, y + 1, z - 1), (wx, wy + 1, wz - 1), world_voxels)
-
+        u, v = PADDED_AREA, PADDED_SIZE  # y, z
     else:  # Z plane
-        a = is_void((x - 1, y    , z), (wx - 1, wy    , wz), world_voxels)
-        b = is_void((x - 1, y - 1, z), (wx - 1, wy - 1, wz), world_voxels)
-        c = is_void((x    , y - 1, z), (wx    , wy - 1, wz), world_voxels)
-        d = is_void((x + 1, y - 1, z), (wx + 1, wy - 1, wz), world_voxels)
-        e = is_void((x + 1, y    , z), (wx + 1, wy    , wz), world_voxels)
-        f = is_void((x + 1, y + 1, z), (wx + 1, wy + 1, wz), world_voxels)
-        g = is_void((x    , y + 1, z), (wx    , wy + 1, wz), world_voxels)
-        h = is_void((x - 1, y + 1, z), (wx - 1, wy + 1, wz), world_voxels)
+        u, v = PADDED_AREA, 1  # y, x
+
+    a = padded_voxels[voxel     - v] == 0
+    b = padded_voxels[voxel - u - v] == 0
+    c = padded_voxels[voxel - u    ] == 0
+    d = padded_voxels[voxel - u + v] == 0
+    e = padded_voxels[voxel     + v] == 0
+    f = padded_voxels[voxel + u + v] == 0
+    g = padded_voxels[voxel + u    ] == 0
+    h = padded_voxels[voxel + u - v] == 0
 
     ao = (a + b + c), (g + h + a), (e + f + g), (c + d + e)
     return ao
@@ -70,10 +64,11 @@ def get_chunk_index(world_voxel_pos):
     cx = wx // CHUNK_SIZE
     cy = wy // CHUNK_SIZE
     cz = wz // CHUNK_SIZE
-    if not (0 <= cx < WORLD_W and 0 <= cy < WORLD_H and 0 <= cz < WORLD_D):
+    if not (0 <= cy < WORLD_H):
         return -1
 
-    index = cx + WORLD_W * cz + WORLD_AREA * cy
+    # chunks are stored in a ring buffer wrapping around the streamed window
+    index = cx % WORLD_W + WORLD_W * (cz % WORLD_D) + WORLD_AREA * cy
     return index
 
 
@@ -82,14 +77,42 @@ def is_void(local_voxel_pos, world_voxel_pos, world_voxels):
     chunk_index = get_chunk_index(world_voxel_pos)
     if chunk_index == -1:
         return False
-    chunk_voxels = world_voxels[chunk_index]
 
     x, y, z = local_voxel_pos
     voxel_index = x % CHUNK_SIZE + z % CHUNK_SIZE * CHUNK_SIZE + y % CHUNK_SIZE * CHUNK_AREA
 
-    if chunk_voxels[voxel_index]:
-        return False
-    return True
+    # world_voxels are the arrays of the voxel store
+    return get_voxel(world_voxels, chunk_index, voxel_index) == 0
+
+
+@njit
+def get_padded_index(x, y, z):
+    # local position -> index of the padded voxels
+    return x + 1 + PADDED_SIZE * (z + 1) + PADDED_AREA * (y + 1)
+
+
+@njit(nogil=True)
+def get_padded_voxels(chunk_voxels, chunk_pos, world_voxels):
+    # the chunk with a one voxel border from its neighbours, PADDED_SIZE^3 voxels indexed like
+    # the chunk. The mesh builders read the neighbours from it instead of the voxel store.
+    # The mesh only depends on whether the neighbours are void, so the border is
+    # 0 for void voxels and 1 for solid ones, also outside the world
+    padded_voxels = np.empty(PADDED_SIZE ** 3, dtype=np.uint8)
+    cx, cy, cz = chunk_pos
+
+    for y in range(PADDED_SIZE):
+        for z in range(PADDED_SIZE):
+            row = PADDED_SIZE * z + PADDED_AREA * y
+            is_border_row = not (0 < y < PADDED_SIZE - 1 and 0 < z < PADDED_SIZE - 1)
+
+            for x in range(PADDED_SIZE):
+                if is_border_row or x == 0 or x == PADDED_SIZE - 1:
+                    lx, ly, lz = x - 1, y - 1, z - 1
+                    world_pos = (cx * CHUNK_SIZE + lx, cy * CHUNK_SIZE + ly, cz * CHUNK_SIZE + lz)
+                    padded_voxels[row + x] = not is_void((lx, ly, lz), world_pos, world_voxels)
+                else:
+                    padded_voxels[row + x] = chunk_voxels[x - 1 + CHUNK_SIZE * (z - 1) + CHUNK_AREA * (y - 1)]
+    return padded_voxels
 
 
 @njit
@@ -100,29 +123,60 @@ def add_data(vertex_data, index, *vertices):
     return index
 
 
-@njit
-def build_chunk_mesh(chunk_voxels, format_size, chunk_pos, world_voxels):
-    vertex_data = np.empty(CHUNK_VOL * 18 * format_size, dtype='uint32')
+def get_slab_data(builder, padded_voxels, format_size, slab):
+    # the scratch buffers fit the worst case mesh and are reused by every build of the thread,
+    # the face keys and rows are the faces of the merging builders
+    size = CHUNK_VOL * 18 * format_size
+    if getattr(scratch, 'vertex_data', None) is None or len(scratch.vertex_data) < size:
+        scratch.vertex_data = np.empty(size, dtype='uint32')
+    if getattr(scratch, 'face_keys', None) is None:
+        scratch.face_keys = np.empty((6, CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE), dtype='uint16')
+        scratch.face_rows = np.empty((6, CHUNK_SIZE, CHUNK_SIZE), dtype='int64')
+
+    # the slab is a range of voxel layers of the chunk
+    y_min = slab * CHUNK_SLAB_SIZE
+    y_max = min(y_min + CHUNK_SLAB_SIZE, CHUNK_SIZE)
+    num_vertices = builder(scratch.vertex_data, scratch.face_keys, scratch.face_rows, padded_voxels, y_min, y_max)
+
+    # exactly sized copy, so that the mesh doesn't keep the scratch buffer alive
+    return scratch.vertex_data[:num_vertices].copy()
+
+
+def get_lod_data(padded_voxels, format_size, lod):
+    # the mesh of the whole chunk downsampled by 2 ** lod
+    size = CHUNK_VOL * 18 * format_size
+    if getattr(scratch, 'vertex_data', None) is None or len(scratch.vertex_data) < size:
+        scratch.vertex_data = np.empty(size, dtype='uint32')
+
+    num_vertices = build_lod_mesh(scratch.vertex_data, padded_voxels, 2 ** lod)
+    return scratch.vertex_data[:num_vertices].copy()
+
+
+def get_mesh_data(builder, padded_voxels, format_size):
+    return np.concatenate([
+        get_slab_data(builder, padded_voxels, format_size, slab)
+        for slab in range(CHUNK_SLABS)
+    ])
+
+
+@njit(nogil=True)
+def build_chunk_mesh(vertex_data, face_keys, face_rows, padded_voxels, y_min, y_max):
+    # a quad per visible voxel face, the face keys and rows aren't used
     index = 0
 
     for x in range(CHUNK_SIZE):
-        for y in range(CHUNK_SIZE):
+        for y in range(y_min, y_max):
             for z in range(CHUNK_SIZE):
-                voxel_id = chunk_voxels[x + CHUNK_SIZE * z + CHUNK_AREA * y]
+                voxel = get_padded_index(x, y, z)
+                voxel_id = padded_voxels[voxel]
 
                 if not voxel_id:
                     continue
 
-                # voxel world position
-                cx, cy, cz = chunk_pos
-                wx = x + cx * CHUNK_SIZE
-                wy = y + cy * CHUNK_SIZE
-                wz = z + cz * CHUNK_SIZE
-
                 # top face
-                if is_void((x, y + 1, z), (wx, wy + 1, wz), world_voxels):
+                if not padded_voxels[voxel + PADDED_AREA]:
                     # get ao values
-                    ao = get_ao((x, y + 1, z), (wx, wy + 1, wz), world_voxels, plane='Y')
+                    ao = get_ao(padded_voxels, voxel + PADDED_AREA, plane='Y')
                     flip_id = ao[1] + ao[3] > ao[0] + ao[2]
 
                     # format: x, y, z, voxel_id, face_id, ao_id, flip_id
@@ -137,8 +191,8 @@ def build_chunk_mesh(chunk_voxels, format_size, chunk_pos, world_voxels):
                         index = add_data(vertex_data, index, v0, v3, v2, v0, v2, v1)
 
                 # bottom face
-                if is_void((x, y - 1, z), (wx, wy - 1, wz), world_voxels):
-                    ao = get_ao((x, y - 1, z), (wx, wy - 1, wz), world_voxels, plane='Y')
+                if not padded_voxels[voxel - PADDED_AREA]:
+                    ao = get_ao(padded_voxels, voxel - PADDED_AREA, plane='Y')
                     flip_id = ao[1] + ao[3] > ao[0] + ao[2]
 
                     v0 = pack_data(x    , y, z    , voxel_id, 1, ao[0], flip_id)
@@ -152,8 +206,8 @@ def build_chunk_mesh(chunk_voxels, format_size, chunk_pos, world_voxels):
                         index = add_data(vertex_data, index, v0, v2, v3, v0, v1, v2)
 
                 # right face
-                if is_void((x + 1, y, z), (wx + 1, wy, wz), world_voxels):
-                    ao = get_ao((x + 1, y, z), (wx + 1, wy, wz), world_voxels, plane='X')
+                if not padded_voxels[voxel + 1]:
+                    ao = get_ao(padded_voxels, voxel + 1, plane='X')
                     flip_id = ao[1] + ao[3] > ao[0] + ao[2]
 
                     v0 = pack_data(x + 1, y    , z    , voxel_id, 2, ao[0], flip_id)
@@ -167,8 +221,8 @@ def build_chunk_mesh(chunk_voxels, format_size, chunk_pos, world_voxels):
                         index = add_data(vertex_data, index, v0, v1, v2, v0, v2, v3)
 
                 # left face
-                if is_void((x - 1, y, z), (wx - 1, wy, wz), world_voxels):
-                    ao = get_ao((x - 1, y, z), (wx - 1, wy, wz), world_voxels, plane='X')
+                if not padded_voxels[voxel - 1]:
+                    ao = get_ao(padded_voxels, voxel - 1, plane='X')
                     flip_id = ao[1] + ao[3] > ao[0] + ao[2]
 
                     v0 = pack_data(x, y    , z    , voxel_id, 3, ao[0], flip_id)
@@ -182,8 +236,8 @@ def build_chunk_mesh(chunk_voxels, format_size, chunk_pos, world_voxels):
                         index = add_data(vertex_data, index, v0, v2, v1, v0, v3, v2)
 
                 # back face
-                if is_void((x, y, z - 1), (wx, wy, wz - 1), world_voxels):
-                    ao = get_ao((x, y, z - 1), (wx, wy, wz - 1), world_voxels, plane='Z')
+                if not padded_voxels[voxel - PADDED_SIZE]:
+                    ao = get_ao(padded_voxels, voxel - PADDED_SIZE, plane='Z')
                     flip_id = ao[1] + ao[3] > ao[0] + ao[2]
 
                     v0 = pack_data(x,     y,     z, voxel_id, 4, ao[0], flip_id)
@@ -197,8 +251,8 @@ def build_chunk_mesh(chunk_voxels, format_size, chunk_pos, world_voxels):
                         index = add_data(vertex_data, index, v0, v1, v2, v0, v2, v3)
 
                 # front face
-                if is_void((x, y, z + 1), (wx, wy, wz + 1), world_voxels):
-                    ao = get_ao((x, y, z + 1), (wx, wy, wz + 1), world_voxels, plane='Z')
+                if not padded_voxels[voxel + PADDED_SIZE]:
+                    ao = get_ao(padded_voxels, voxel + PADDED_SIZE, plane='Z')
                     flip_id = ao[1] + ao[3] > ao[0] + ao[2]
 
                     v0 = pack_data(x    , y    , z + 1, voxel_id, 5, ao[0], flip_id)
@@ -211,4 +265,498 @@ def build_chunk_mesh(chunk_voxels, format_size, chunk_pos, world_voxels):
                     else:
                         index = add_data(vertex_data, index, v0, v2, v1, v0, v3, v2)
 
-    return vertex_data[:index + 1]
+    return index
+
+
+@njit
+def add_quad(vertex_data, index, face_id, v0, v1, v2, v3, flip_id):
+    # same triangles as the faces of build_chunk_mesh
+    if face_id == 0:
+        if flip_id:
+            return add_data(vertex_data, index, v1, v0, v3, v1, v3, v2)
+        return add_data(vertex_data, index, v0, v3, v2, v0, v2, v1)
+
+    if face_id == 1:
+        if flip_id:
+            return add_data(vertex_data, index, v1, v3, v0, v1, v2, v3)
+        return add_data(vertex_data, index, v0, v2, v3, v0, v1, v2)
+
+    if face_id == 2 or face_id == 4:
+        if flip_id:
+            return add_data(vertex_data, index, v3, v0, v1, v3, v1, v2)
+        return add_data(vertex_data, index, v0, v1, v2, v0, v2, v3)
+
+    # face_id 3 or 5
+    if flip_id:
+        return add_data(vertex_data, index, v3, v1, v0, v3, v2, v1)
+    return add_data(vertex_data, index, v0, v2, v1, v0, v3, v2)
+
+
+@njit
+def is_row_equal(mask, u, v, h, key):
+    for i in range(v, v + h):
+        if mask[u, i] != key:
+            return False
+    return True
+
+
+@njit
+def get_slice_pos(axis, d, u, v):
+    # slice coords -> local position. Y faces: (x, z) = (u, v)
+    # X faces: (y, z) = (u, v)   Z faces: (y, x) = (u, v)
+    # so that the face corners v0, v1, v2, v3 are always (0, 0), (1, 0), (1, 1), (0, 1)
+    if axis == 0:
+        return u, d, v
+    if axis == 1:
+        return d, u, v
+    return v, u, d
+
+
+@njit
+def get_face_key(voxel_id, ao):
+    # voxel_id: 8bit  ao0: 2bit  ao1: 2bit  ao2: 2bit  ao3: 2bit
+    return voxel_id | ao[0] << 8 | ao[1] << 10 | ao[2] << 12 | ao[3] << 14
+
+
+@njit
+def clear_faces(face_keys, face_rows, y_min, y_max):
+    # the face keys and rows of the slab, the arrays are scratch buffers of the whole chunk.
+    # Only the layers y_min..y_max are used: d of the Y faces and u of the X and Z faces
+    face_keys[:2, y_min:y_max] = 0
+    face_keys[2:, :, y_min:y_max] = 0
+    face_rows[:2, y_min:y_max] = 0
+    face_rows[2:, :, y_min:y_max] = 0
+
+
+@njit(nogil=True)
+def build_chunk_mesh_greedy(vertex_data, face_keys, face_rows, padded_voxels, y_min, y_max):
+    # the visible faces of the voxels, merged into larger quads by merge_faces
+    # face keys of all visible faces, indexed by face_id and slice coords (d, u, v).
+    # bit v of face_rows[face_id, d, u] is set if the face key at (d, u, v) is
+    clear_faces(face_keys, face_rows, y_min, y_max)
+
+    for x in range(CHUNK_SIZE):
+        for y in range(y_min, y_max):
+            for z in range(CHUNK_SIZE):
+                voxel = get_padded_index(x, y, z)
+                voxel_id = padded_voxels[voxel]
+
+                if not voxel_id:
+                    continue
+
+                # top face
+                if not padded_voxels[voxel + PADDED_AREA]:
+                    ao = get_ao(padded_voxels, voxel + PADDED_AREA, plane='Y')
+                    face_keys[0, y, x, z] = get_face_key(voxel_id, ao)
+                    face_rows[0, y, x] |= 1 << z
+
+                # bottom face
+                if not padded_voxels[voxel - PADDED_AREA]:
+                    ao = get_ao(padded_voxels, voxel - PADDED_AREA, plane='Y')
+                    face_keys[1, y, x, z] = get_face_key(voxel_id, ao)
+                    face_rows[1, y, x] |= 1 << z
+
+                # right face
+                if not padded_voxels[voxel + 1]:
+                    ao = get_ao(padded_voxels, voxel + 1, plane='X')
+                    face_keys[2, x, y, z] = get_face_key(voxel_id, ao)
+                    face_rows[2, x, y] |= 1 << z
+
+                # left face
+                if not padded_voxels[voxel - 1]:
+                    ao = get_ao(padded_voxels, voxel - 1, plane='X')
+                    face_keys[3, x, y, z] = get_face_key(voxel_id, ao)
+                    face_rows[3, x, y] |= 1 << z
+
+                # back face
+                if not padded_voxels[voxel - PADDED_SIZE]:
+                    ao = get_ao(padded_voxels, voxel - PADDED_SIZE, plane='Z')
+                    face_keys[4, z, y, x] = get_face_key(voxel_id, ao)
+                    face_rows[4, z, y] |= 1 << x
+
+                # front face
+                if not padded_voxels[voxel + PADDED_SIZE]:
+                    ao = get_ao(padded_voxels, voxel + PADDED_SIZE, plane='Z')
+                    face_keys[5, z, y, x] = get_face_key(voxel_id, ao)
+                    face_rows[5, z, y] |= 1 << x
+
+    return merge_faces(vertex_data, face_keys, face_rows, y_min, y_max)
+
+
+# bit positions of the powers of two, by the top 6 bits of their product with a de Bruijn sequence
+DE_BRUIJN = 0x03f79d71b4ca8b09
+DE_BRUIJN_BITS = np.zeros(64, dtype='int64')
+DE_BRUIJN_BITS[[((1 << i) * DE_BRUIJN & (1 << 64) - 1) >> 58 for i in range(64)]] = np.arange(64)
+
+
+@njit
+def get_low_bit(mask):
+    # position of the lowest set bit, the product wraps around in 64 bits
+    return DE_BRUIJN_BITS[((mask & -mask) * DE_BRUIJN) >> 58 & 63]
+
+
+@njit
+def merge_faces(vertex_data, face_keys, face_rows, y_min, y_max):
+    # visible faces with the same voxel_id and ao in a slice are merged into larger quads
+    index = 0
+
+    for face_id in range(6):
+        axis = face_id // 2
+        d_min, d_max = (y_min, y_max) if axis == 0 else (0, CHUNK_SIZE)
+        u_min, u_max = (0, CHUNK_SIZE) if axis == 0 else (y_min, y_max)
+
+        for d in range(d_min, d_max):
+            # faces of the top, right and front sides lie on the far plane of the voxel
+            plane = d if face_id == 1 or face_id == 3 or face_id == 4 else d + 1
+            mask = face_keys[face_id, d]
+
+            for u in range(u_min, u_max):
+                # the faces left in the row, from the lowest v
+                while face_rows[face_id, d, u]:
+                    v = get_low_bit(face_rows[face_id, d, u])
+                    key = mask[u, v]
+
+                    ao0, ao1, ao2, ao3 = key >> 8 & 3, key >> 10 & 3, key >> 12 & 3, key >> 14 & 3
+
+                    # quads only grow in the directions in which the ao doesn't change,
+                    # so the shading looks the same as with single faces
+                    h = 1
+                    if ao0 == ao3 and ao1 == ao2:
+                        while v + h < CHUNK_SIZE and mask[u, v + h] == key:
+                            h += 1
+
+                    w = 1
+                    if ao0 == ao1 and ao3 == ao2:
+                        while u + w < u_max and is_row_equal(mask, u + w, v, h, key):
+                            w += 1
+
+                    mask[u:u + w, v:v + h] = 0
+                    for i in range(u, u + w):
+                        face_rows[face_id, d, i] &= ~(((1 << h) - 1) << v)
+
+                    voxel_id = key & 255
+                    flip_id = ao1 + ao3 > ao0 + ao2
+
+                    x, y, z = get_slice_pos(axis, plane, u, v)
+                    v0 = pack_data(x, y, z, voxel_id, face_id, ao0, flip_id)
+                    x, y, z = get_slice_pos(axis, plane, u + w, v)
+                    v1 = pack_data(x, y, z, voxel_id, face_id, ao1, flip_id)
+                    x, y, z = get_slice_pos(axis, plane, u + w, v + h)
+                    v2 = pack_data(x, y, z, voxel_id, face_id, ao2, flip_id)
+                    x, y, z = get_slice_pos(axis, plane, u, v + h)
+                    v3 = pack_data(x, y, z, voxel_id, face_id, ao3, flip_id)
+
+                    index = add_quad(vertex_data, index, face_id, v0, v1, v2, v3, flip_id)
+
+    return index
+
+
+@njit
+def get_row_ao(lower, row, upper, bit):
+    # get_ao from the solid rows of the plane of the face, around the bit of the voxel
+    # in front of it: the lower and upper rows are one step back and forward along u
+    a = not row   >> (bit - 1) & 1
+    b = not lower >> (bit - 1) & 1
+    c = not lower >> bit & 1
+    d = not lower >> (bit + 1) & 1
+    e = not row   >> (bit + 1) & 1
+    f = not upper >> (bit + 1) & 1
+    g = not upper >> bit & 1
+    h = not upper >> (bit - 1) & 1
+
+    ao = (a + b + c), (g + h + a), (e + f + g), (c + d + e)
+    return ao
+
+
+@njit(nogil=True)
+def build_chunk_mesh_binary(vertex_data, face_keys, face_rows, padded_voxels, y_min, y_max):
+    # the greedy mesh, with the visible faces found a row at a time: bit v of a row is
+    # set if the voxel v of the row is solid, so the faces of a row towards the next row
+    # are row & ~next_row. The rows run along z, and along x for the Z faces, which
+    # are the v axes of the face keys
+    clear_faces(face_keys, face_rows, y_min, y_max)
+
+    # rows_z[x + 1, y + 1] along z and rows_x[z + 1, y + 1] along x, including the borders,
+    # in one pass over the padded voxels. Bit i is padded coordinate i, so v + 1
+    rows_z = np.zeros((PADDED_SIZE, PADDED_SIZE), dtype=np.int64)
+    rows_x = np.zeros((PADDED_SIZE, PADDED_SIZE), dtype=np.int64)
+    for y in range(y_min, y_max + 2):
+        for z in range(PADDED_SIZE):
+            row = PADDED_SIZE * z + PADDED_AREA * y
+            row_x = 0
+            for x in range(PADDED_SIZE):
+                is_solid = np.int64(padded_voxels[row + x] != 0)
+                row_x |= is_solid << x
+                rows_z[x, y] |= is_solid << z
+            rows_x[z, y] = row_x
+
+    # the bits of the chunk voxels
+    inner = ((1 << CHUNK_SIZE) - 1) << 1
+
+    for y in range(y_min, y_max):
+        for x in range(CHUNK_SIZE):
+            row = rows_z[x + 1, y + 1]
+
+            # top faces
+            faces = (row & ~rows_z[x + 1, y + 2] & inner) >> 1
+            face_rows[0, y, x] = faces
+            while faces:
+                z = get_low_bit(faces)
+                faces &= faces - 1
+                voxel = get_padded_index(x, y, z)
+                ao = get_row_ao(rows_z[x, y + 2], rows_z[x + 1, y + 2], rows_z[x + 2, y + 2], z + 1)
+                face_keys[0, y, x, z] = get_face_key(padded_voxels[voxel], ao)
+
+            # bottom faces
+            faces = (row & ~rows_z[x + 1, y] & inner) >> 1
+            face_rows[1, y, x] = faces
+            while faces:
+                z = get_low_bit(faces)
+                faces &= faces - 1
+                voxel = get_padded_index(x, y, z)
+                ao = get_row_ao(rows_z[x, y], rows_z[x + 1, y], rows_z[x + 2, y], z + 1)
+                face_keys[1, y, x, z] = get_face_key(padded_voxels[voxel], ao)
+
+            # right faces
+            faces = (row & ~rows_z[x + 2, y + 1] & inner) >> 1
+            face_rows[2, x, y] = faces
+            while faces:
+                z = get_low_bit(faces)
+                faces &= faces - 1
+                voxel = get_padded_index(x, y, z)
+                ao = get_row_ao(rows_z[x + 2, y], rows_z[x + 2, y + 1], rows_z[x + 2, y + 2], z + 1)
+                face_keys[2, x, y, z] = get_face_key(padded_voxels[voxel], ao)
+
+            # left faces
+            faces = (row & ~rows_z[x, y + 1] & inner) >> 1
+            face_rows[3, x, y] = faces
+            while faces:
+                z = get_low_bit(faces)
+                faces &= faces - 1
+                voxel = get_padded_index(x, y, z)
+                ao = get_row_ao(rows_z[x, y], rows_z[x, y + 1], rows_z[x, y + 2], z + 1)
+                face_keys[3, x, y, z] = get_face_key(padded_voxels[voxel], ao)
+
+        for z in range(CHUNK_SIZE):
+            row = rows_x[z + 1, y + 1]
+
+            # back faces
+            faces = (row & ~rows_x[z, y + 1] & inner) >> 1
+            face_rows[4, z, y] = faces
+            while faces:
+                x = get_low_bit(faces)
+                faces &= faces - 1
+                voxel = get_padded_index(x, y, z)
+                ao = get_row_ao(rows_x[z, y], rows_x[z, y + 1], rows_x[z, y + 2], x + 1)
+                face_keys[4, z, y, x] = get_face_key(padded_voxels[voxel], ao)
+
+            # front faces
+            faces = (row & ~rows_x[z + 2, y + 1] & inner) >> 1
+            face_rows[5, z, y] = faces
+            while faces:
+                x = get_low_bit(faces)
+                faces &= faces - 1
+                voxel = get_padded_index(x, y, z)
+                ao = get_row_ao(rows_x[z + 2, y], rows_x[z + 2, y + 1], rows_x[z + 2, y + 2], x + 1)
+                face_keys[5, z, y, x] = get_face_key(padded_voxels[voxel], ao)
+
+    return merge_faces(vertex_data, face_keys, face_rows, y_min, y_max)
+
+
+# the mesh builders by CHUNK_MESHER, all with the same vertex format
+CHUNK_MESHERS = {
+    'default': build_chunk_mesh,
+    'greedy': build_chunk_mesh_greedy,
+    'binary': build_chunk_mesh_binary,
+}
+
+
+@njit
+def downsample_voxels(padded_voxels, scale):
+    # cells of scale^3 voxels are solid if at least half of the voxels are,
+    # with the voxel id of the top solid voxel, so the surface keeps its material
+    size = CHUNK_SIZE // scale
+    cells = np.zeros((size, size, size), dtype=np.uint8)
+
+    for cx in range(size):
+        for cy in range(size):
+            for cz in range(size):
+                num_solid = 0
+                voxel_id = 0
+                for y in range(cy * scale + scale - 1, cy * scale - 1, -1):
+                    for x in range(cx * scale, cx * scale + scale):
+                        for z in range(cz * scale, cz * scale + scale):
+                            solid_id = padded_voxels[get_padded_index(x, y, z)]
+                            if solid_id:
+                                num_solid += 1
+                                if not voxel_id:
+                                    voxel_id = solid_id
+
+                if 2 * num_solid >= scale ** 3:
+                    cells[cx, cy, cz] = voxel_id
+    return cells
+
+
+@njit
+def is_border_void(padded_voxels, face_id, x, y, z, scale):
+    # whether any voxel of the neighbouring chunk next to the face of the cell at
+    # local position x, y, z is void
+    axis = face_id // 2
+    plane = -1 if face_id == 1 or face_id == 3 or face_id == 4 else CHUNK_SIZE
+    for u in range(scale):
+        for v in range(scale):
+            if axis == 0:
+                voxel = get_padded_index(x + u, plane, z + v)
+            elif axis == 1:
+                voxel = get_padded_index(plane, y + u, z + v)
+            else:
+                voxel = get_padded_index(x + v, y + u, plane)
+            if not padded_voxels[voxel]:
+                return True
+    return False
+
+
+@njit
+def add_lod_quad(vertex_data, index, face_id, voxel_id, d, u, v, w, h):
+    # a w x h face without ao on the plane d, in slice coords
+    axis = face_id // 2
+    x, y, z = get_slice_pos(axis, d, u, v)
+    v0 = pack_data(x, y, z, voxel_id, face_id, 3, 0)
+    x, y, z = get_slice_pos(axis, d, u + w, v)
+    v1 = pack_data(x, y, z, voxel_id, face_id, 3, 0)
+    x, y, z = get_slice_pos(axis, d, u + w, v + h)
+    v2 = pack_data(x, y, z, voxel_id, face_id, 3, 0)
+    x, y, z = get_slice_pos(axis, d, u, v + h)
+    v3 = pack_data(x, y, z, voxel_id, face_id, 3, 0)
+    return add_quad(vertex_data, index, face_id, v0, v1, v2, v3, 0)
+
+
+@njit
+def is_seal(padded_voxels, cells, border, plane, inner, u, v, scale):
+    # a solid neighbour voxel next to a void cell
+    if border < 2:
+        outside = get_padded_index(plane, u, v)
+        cell = cells[inner // scale, u // scale, v // scale]
+    else:
+        outside = get_padded_index(v, u, plane)
+        cell = cells[v // scale, u // scale, inner // scale]
+    return padded_voxels[outside] and not cell
+
+
+@njit(nogil=True)
+def build_lod_mesh(vertex_data, padded_voxels, scale):
+    # mesh of the chunk downsampled to cells of scale^3 voxels, for distant chunks.
+    # Cells at the chunk border show their faces if any neighbour voxel next to them is
+    # void, and the solid neighbour voxels next to void cells of the x and z borders get
+    # their faces too, so there are no cracks towards chunks of another level of detail
+    index = 0
+    size = CHUNK_SIZE // scale
+    cells = downsample_voxels(padded_voxels, scale)
+
+    for cx in range(size):
+        for cy in range(size):
+            for cz in range(size):
+                voxel_id = cells[cx, cy, cz]
+                if not voxel_id:
+                    continue
+                x, y, z = cx * scale, cy * scale, cz * scale
+
+                for face_id in range(6):
+                    axis = face_id // 2
+                    dx, dy, dz = FACE_DIRS[face_id]
+                    nx, ny, nz = cx + dx, cy + dy, cz + dz
+
+                    if 0 <= nx < size and 0 <= ny < size and 0 <= nz < size:
+                        if cells[nx, ny, nz]:
+                            continue
+                    elif not is_border_void(padded_voxels, face_id, x, y, z, scale):
+                        continue
+
+                    # faces of the top, right and front sides lie on the far plane of the cell
+                    far = face_id == 0 or face_id == 2 or face_id == 5
+                    if axis == 0:
+                        index = add_lod_quad(vertex_data, index, face_id, voxel_id, y + far * scale, x, z, scale, scale)
+                    elif axis == 1:
+                        index = add_lod_quad(vertex_data, index, face_id, voxel_id, x + far * scale, y, z, scale, scale)
+                    else:
+                        index = add_lod_quad(vertex_data, index, face_id, voxel_id, z + far * scale, y, x, scale, scale)
+
+    # seals: faces of the neighbour voxels of the x and z borders, facing into the chunk.
+    # Vertical runs of them are merged
+    for border in range(4):
+        plane = -1 if border % 2 == 0 else CHUNK_SIZE
+        inner = 0 if border % 2 == 0 else CHUNK_SIZE - 1
+        face_id = (2, 3, 5, 4)[border]
+        d = 0 if border % 2 == 0 else CHUNK_SIZE
+
+        # u is y, v is z for the x borders and x for the z borders
+        for v in range(CHUNK_SIZE):
+            u = 0
+            while u < CHUNK_SIZE:
+                if not is_seal(padded_voxels, cells, border, plane, inner, u, v, scale):
+                    u += 1
+                    continue
+
+                w = 1
+                while u + w < CHUNK_SIZE and is_seal(padded_voxels, cells, border, plane, inner, u + w, v, scale):
+                    w += 1
+
+                # textured like the nearest cell below the run
+                cx, cz = (inner // scale, v // scale) if border < 2 else (v // scale, inner // scale)
+                voxel_id = DIRT
+                for cy in range(u // scale - 1, -1, -1):
+                    if cells[cx, cy, cz]:
+                        voxel_id = cells[cx, cy, cz]
+                        break
+
+                index = add_lod_quad(vertex_data, index, face_id, voxel_id, d, u, v, w, 1)
+                u += w
+
+    return index
+
+
+@njit
+def pack_face(d, u, v, w, h, voxel_id, face_id, ao):
+    # d: 6bit  u: 6bit  v: 6bit  w: 6bit  h: 6bit  |  voxel_id: 8bit  face_id: 3bit  ao0..ao3: 2bit each
+    # the low and high 32 bits are read as the uvec2 of the face instanced chunk shader
+    low = d | u << 6 | v << 12 | w << 18 | h << 24
+    high = voxel_id | face_id << 8 | ao[0] << 11 | ao[1] << 13 | ao[2] << 15 | ao[3] << 17
+    return low | high << 32
+
+
+@njit(nogil=True)
+def get_face_data(vertex_data):
+    # one record per quad of the vertex data, the 6 vertices of the quad are folded back into
+    # its plane d, corner u, v, size w x h in slice coords and the ao of its corners v0..v3
+    num_faces = len(vertex_data) // 6
+    face_data = np.empty(num_faces, dtype=np.uint64)
+    us = np.empty(6, dtype=np.int64)
+    vs = np.empty(6, dtype=np.int64)
+    ao = np.zeros(4, dtype=np.int64)
+
+    for face in range(num_faces):
+        packed_data = np.int64(vertex_data[6 * face])
+        voxel_id = packed_data >> 6 & 255
+        face_id = packed_data >> 3 & 7
+        axis = face_id // 2
+
+        for i in range(6):
+            packed_data = np.int64(vertex_data[6 * face + i])
+            x, y, z = packed_data >> 26, packed_data >> 20 & 63, packed_data >> 14 & 63
+            # inverse of get_slice_pos
+            if axis == 0:
+                d, us[i], vs[i] = y, x, z
+            elif axis == 1:
+                d, us[i], vs[i] = x, y, z
+            else:
+                d, us[i], vs[i] = z, y, x
+
+        u, v = us.min(), vs.min()
+        for i in range(6):
+            # corners (0, 0), (1, 0), (1, 1), (0, 1)
+            is_u, is_v = us[i] > u, vs[i] > v
+            corner = 2 if is_u and is_v else 1 if is_u else 3 if is_v else 0
+            ao[corner] = np.int64(vertex_data[6 * face + i]) >> 1 & 3
+
+        face_data[face] = pack_face(d, u, v, us.max() - u, vs.max() - v, voxel_id, face_id, ao)
+    return face_data
@@ -0,0 +1,83 @@
+import os
+import hashlib
+import threading
+from settings import *
+from meshes.chunk_mesh_builder import MESHER_VERSION
+
+
+class MeshCache:
+    # vertex data and face connections of chunk meshes saved on disk. The key is a hash of
+    # everything the mesh depends on: the padded voxels of the chunk and the mesher,
+    # so unchanged chunks skip meshing on the next start
+    def __init__(self, path=MESH_CACHE_DIR, dtype='uint32', max_size=MESH_CACHE_MAX_SIZE):
+        self.path = path
+        # of the vertex data, uint64 for the face records
+        self.dtype = dtype
+        os.makedirs(path, exist_ok=True)
+        self.prune(max_size * 2 ** 20)
+
+        # counted on the main thread, the loads of the batch mesher threads once per batch
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def get_key(self, padded_voxels, lod=0):
+        key = hashlib.blake2b(padded_voxels, digest_size=16)
+        key.update(f'{CHUNK_MESHER} {CHUNK_MESH_FORMAT} {MESHER_VERSION} {CHUNK_SLAB_SIZE} {lod}'.encode())
+        return key.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.path, f'{key}.mesh')
+
+    def load(self, key):
+        # vertex data of the slabs and the face connections, None if not cached.
+        # An entry is the connections (int64), the number of slabs, their sizes and
+        # the vertex data (dtype)
+        path = self.get_path(key)
+        if not os.path.exists(path):
+            return None
+
+        cached = np.fromfile(path, dtype='uint32')
+        connections = int(cached[:2].view('int64')[0])
+        num_slabs = cached[2]
+        slab_sizes = cached[3:3 + num_slabs]
+        vertex_data = cached[3 + num_slabs:].view(self.dtype)
+        # the modification time is the last use of the entry, for prune
+        os.utime(path)
+        return np.split(vertex_data, np.cumsum(slab_sizes)[:-1]), connections
+
+    def count(self, num_hits, num_misses):
+        self.num_hits += num_hits
+        self.num_misses += num_misses
+
+    def save(self, key, slabs, connections):
+        # replaced atomically, so that an entry is never partly written. Identical chunks meshed
+        # by the threads of the batch mesher save the same entry, each to its own temporary file
+        path = self.get_path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(np.int64(connections).tobytes())
+            file.write(np.array([len(slabs)] + [len(vertex_data) for vertex_data in slabs], dtype='uint32').tobytes())
+            for vertex_data in slabs:
+                file.write(vertex_data.tobytes())
+        os.replace(tmp_path, path)
+
+    def prune(self, max_size):
+        # removes the least recently used entries until the cache fits in max_size bytes, and
+        # the temporary files of interrupted saves. Returns the number of removed files
+        entries = []
+        num_removed = 0
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.tmp'):
+                os.remove(entry.path)
+                num_removed += 1
+            elif entry.name.endswith('.mesh'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = 0
+        for _, entry_size, path in sorted(entries, reverse=True):
+            size += entry_size
+            if size > max_size:
+                os.remove(path)
+                num_removed += 1
+        return num_removed
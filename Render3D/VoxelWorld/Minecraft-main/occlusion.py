@@ -0,0 +1,131 @@
+from settings import *
+
+# chunk faces in the order of the mesh face ids: top, bottom, right, left, back, front
+FACE_DIRS = np.array([(0, 1, 0), (0, -1, 0), (1, 0, 0), (-1, 0, 0), (0, 0, -1), (0, 0, 1)])
+
+# bit face_a * 6 + face_b is set if the faces are connected through the air of the chunk
+ALL_CONNECTED = (1 << 36) - 1
+
+
+@njit(nogil=True)
+def get_face_connections(chunk_voxels):
+    # flood fill of the air regions touching the chunk border, the faces touched
+    # by the same region are connected
+    if not np.any(chunk_voxels):
+        return ALL_CONNECTED
+
+    visited = np.zeros(CHUNK_VOL, dtype=np.bool_)
+    stack = np.empty(CHUNK_VOL, dtype=np.int32)
+    connections = 0
+
+    for start in range(CHUNK_VOL):
+        if chunk_voxels[start] or visited[start]:
+            continue
+        x, y, z = start % CHUNK_SIZE, start // CHUNK_AREA, start // CHUNK_SIZE % CHUNK_SIZE
+        if 0 < x < CHUNK_SIZE - 1 and 0 < y < CHUNK_SIZE - 1 and 0 < z < CHUNK_SIZE - 1:
+            continue
+
+        faces = 0
+        visited[start] = True
+        stack[0] = start
+        size = 1
+        while size:
+            size -= 1
+            index = stack[size]
+            x, y, z = index % CHUNK_SIZE, index // CHUNK_AREA, index // CHUNK_SIZE % CHUNK_SIZE
+
+            for face_id in range(6):
+                dx, dy, dz = FACE_DIRS[face_id]
+                nx, ny, nz = x + dx, y + dy, z + dz
+                if not (0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE and 0 <= nz < CHUNK_SIZE):
+                    faces |= 1 << face_id
+                    continue
+
+                neighbour = nx + CHUNK_SIZE * nz + CHUNK_AREA * ny
+                if not chunk_voxels[neighbour] and not visited[neighbour]:
+                    visited[neighbour] = True
+                    stack[size] = neighbour
+                    size += 1
+
+        for face_a in range(6):
+            for face_b in range(6):
+                if faces >> face_a & 1 and faces >> face_b & 1:
+                    connections |= 1 << (face_a * 6 + face_b)
+
+    return connections
+
+
+@njit
+def changes_connections(chunk_voxels, voxel_index, connections):
+    # whether the edit of a voxel, already written to chunk_voxels, can change the face
+    # connections of the chunk. A voxel inside the chunk with at most one air neighbour
+    # neither joins nor splits air regions and touches no face, and an added voxel can
+    # only remove connections, a removed one only add them
+    is_removed = chunk_voxels[voxel_index] == 0
+    if connections == (ALL_CONNECTED if is_removed else 0):
+        return False
+
+    x, y, z = voxel_index % CHUNK_SIZE, voxel_index // CHUNK_AREA, voxel_index // CHUNK_SIZE % CHUNK_SIZE
+    if not (0 < x < CHUNK_SIZE - 1 and 0 < y < CHUNK_SIZE - 1 and 0 < z < CHUNK_SIZE - 1):
+        return True
+
+    num_air = 0
+    for face_id in range(6):
+        dx, dy, dz = FACE_DIRS[face_id]
+        if not chunk_voxels[(x + dx) + CHUNK_SIZE * (z + dz) + CHUNK_AREA * (y + dy)]:
+            num_air += 1
+    return num_air > 1
+
+
+@njit
+def get_reachable_chunks(connections, on_frustum, camera_chunk, origin):
+    # breadth first search of the inner chunks of the window that can be seen from the
+    # camera chunk: through connected faces only, never back towards the camera
+    # and never outside the frustum
+    is_reachable = np.zeros(WORLD_VOL, dtype=np.bool_)
+    queue = np.empty((WORLD_VOL, 5), dtype=np.int64)  # cx, cy, cz, entry face, directions
+    head, tail = 0, 0
+
+    ox, oz = origin
+    cx, cy, cz = camera_chunk
+    if 0 <= cy < WORLD_H:
+        queue[tail] = cx, cy, cz, -1, 0
+        tail += 1
+        is_reachable[cx % WORLD_W + WORLD_W * (cz % WORLD_D) + WORLD_AREA * cy] = True
+    else:
+        # the camera is above or below the world, which is entered through its top or bottom
+        y, face_id = (WORLD_H - 1, 0) if cy >= WORLD_H else (0, 1)
+        for x in range(ox + 1, ox + WORLD_W - 1):
+            for z in range(oz + 1, oz + WORLD_D - 1):
+                index = x % WORLD_W + WORLD_W * (z % WORLD_D) + WORLD_AREA * y
+                if on_frustum[index]:
+                    queue[tail] = x, y, z, face_id, 1 << (face_id ^ 1)
+                    tail += 1
+                    is_reachable[index] = True
+
+    while head < tail:
+        x, y, z, entry_face, directions = queue[head]
+        head += 1
+        index = x % WORLD_W + WORLD_W * (z % WORLD_D) + WORLD_AREA * y
+
+        for face_id in range(6):
+            # the opposite face has the odd / even face id next to it
+            if directions >> (face_id ^ 1) & 1:
+                continue
+            if entry_face != -1 and not connections[index] >> (entry_face * 6 + face_id) & 1:
+                continue
+
+            dx, dy, dz = FACE_DIRS[face_id]
+            nx, ny, nz = x + dx, y + dy, z + dz
+            if not (0 <= ny < WORLD_H and ox < nx < ox + WORLD_W - 1 and oz < nz < oz + WORLD_D - 1):
+                continue
+
+            neighbour = nx % WORLD_W + WORLD_W * (nz % WORLD_D) + WORLD_AREA * ny
+            if is_reachable[neighbour] or not on_frustum[neighbour]:
+                continue
+
+            is_reachable[neighbour] = True
+            queue[tail] = nx, ny, nz, face_id ^ 1, directions | 1 << face_id
+            tail += 1
+
+    return is_reachable
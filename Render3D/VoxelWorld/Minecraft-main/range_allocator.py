@@ -0,0 +1,50 @@
+from bisect import bisect_left
+
+
+class RangeAllocator:
+    # first fit sub-allocator of [offset, offset + size) ranges of a linear space, e.g. a buffer.
+    # The free ranges are kept sorted by offset and merged with their free neighbours
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.free_ranges = [(0, capacity)]  # (offset, size)
+        self.used = 0
+
+    @property
+    def largest_free(self):
+        return max((size for _, size in self.free_ranges), default=0)
+
+    def alloc(self, size):
+        # offset of the new range, or -1 if no free range is large enough
+        for i, (offset, free_size) in enumerate(self.free_ranges):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free_ranges[i]
+                else:
+                    self.free_ranges[i] = offset + size, free_size - size
+                self.used += size
+                return offset
+        return -1
+
+    def free(self, offset, size):
+        self.used -= size
+        i = bisect_left(self.free_ranges, (offset, size))
+        self.free_ranges.insert(i, (offset, size))
+
+        # merge with the next and the previous free range
+        if i + 1 < len(self.free_ranges):
+            next_offset, next_size = self.free_ranges[i + 1]
+            if offset + size == next_offset:
+                size += next_size
+                self.free_ranges[i] = offset, size
+                del self.free_ranges[i + 1]
+        if i > 0:
+            prev_offset, prev_size = self.free_ranges[i - 1]
+            if prev_offset + prev_size == offset:
+                self.free_ranges[i - 1] = prev_offset, prev_size + size
+                del self.free_ranges[i]
+
+    def reset(self, capacity, used=0):
+        # after compaction: the first used units are taken, the rest is one free range
+        self.capacity = capacity
+        self.used = used
+        self.free_ranges = [(used, capacity - used)] if used < capacity else []
@@ -0,0 +1,81 @@
+from settings import *
+from numba import prange
+from voxel_store import get_voxel
+
+# hit of a ray: voxel_id, world position x, y, z and normal x, y, z of the face it entered.
+# The voxel_id is 0 if nothing was hit
+HIT_SIZE = 7
+
+
+@njit
+def get_step(a1, a2):
+    # sign, the ray length between two crossings of the axis, and to the first crossing
+    d = 1 if a2 > a1 else -1 if a2 < a1 else 0
+    delta = min(d / (a2 - a1), 10000000.0) if d != 0 else 10000000.0
+    fract = a1 - math.floor(a1)
+    max_a = delta * (1.0 - fract) if d > 0 else delta * fract
+    return d, delta, max_a
+
+
+@njit
+def cast_ray(start, end, world_voxels, has_mesh, origin, hit):
+    # voxel traversal (DDA) from the start to the end point, hit is set to the first solid
+    # voxel on the way. Only the chunks of the window with a mesh can be hit
+    x1, y1, z1 = start
+    x2, y2, z2 = end
+    ox, oz = origin
+
+    x, y, z = math.floor(x1), math.floor(y1), math.floor(z1)
+    dx, delta_x, max_x = get_step(x1, x2)
+    dy, delta_y, max_y = get_step(y1, y2)
+    dz, delta_z, max_z = get_step(z1, z2)
+    step_dir = -1
+    hit[:] = 0
+
+    while not (max_x > 1.0 and max_y > 1.0 and max_z > 1.0):
+        cx, cy, cz = x // CHUNK_SIZE, y // CHUNK_SIZE, z // CHUNK_SIZE
+        if 0 <= cy < WORLD_H and ox <= cx < ox + WORLD_W and oz <= cz < oz + WORLD_D:
+            chunk_index = cx % WORLD_W + WORLD_W * (cz % WORLD_D) + WORLD_AREA * cy
+
+            if has_mesh[chunk_index]:
+                voxel_index = x % CHUNK_SIZE + CHUNK_SIZE * (z % CHUNK_SIZE) + CHUNK_AREA * (y % CHUNK_SIZE)
+                voxel_id = get_voxel(world_voxels, chunk_index, voxel_index)
+                if voxel_id:
+                    hit[0], hit[1], hit[2], hit[3] = voxel_id, x, y, z
+                    if step_dir == 0:
+                        hit[4] = -dx
+                    elif step_dir == 1:
+                        hit[5] = -dy
+                    else:
+                        hit[6] = -dz
+                    return True
+
+        if max_x < max_y:
+            if max_x < max_z:
+                x += dx
+                max_x += delta_x
+                step_dir = 0
+            else:
+                z += dz
+                max_z += delta_z
+                step_dir = 2
+        else:
+            if max_y < max_z:
+                y += dy
+                max_y += delta_y
+                step_dir = 1
+            else:
+                z += dz
+                max_z += delta_z
+                step_dir = 2
+    return False
+
+
+@njit(parallel=True)
+def cast_rays(origins, directions, max_dist, world_voxels, has_mesh, origin):
+    # cast_ray for N rays of length max_dist, e.g. for line of sight checks.
+    # Returns the hit positions [N, 3], normals [N, 3] and voxel ids [N]
+    hits = np.zeros((len(origins), HIT_SIZE), dtype=np.int64)
+    for i in prange(len(origins)):
+        cast_ray(origins[i], origins[i] + directions[i] * max_dist, world_voxels, has_mesh, origin, hits[i])
+    return hits[:, 1:4].copy(), hits[:, 4:7].copy(), hits[:, 0].astype(np.uint8)
@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+from settings import *
+from terrain_gen import TERRAIN_VERSION
+
+# region file: a header, a flag per chunk set once the chunk is saved, then the dense voxels
+# of the chunks, all memory mapped. The voxels start at a page boundary
+REGION_MAGIC = 0x56524732  # 'VRG2'
+REGION_HEADER = np.array([REGION_MAGIC, REGION_SIZE, WORLD_H, CHUNK_SIZE, SEED, TERRAIN_VERSION], dtype='int32')
+REGION_SHAPE = (REGION_SIZE, REGION_SIZE, WORLD_H)
+REGION_DATA_OFFSET = 4096
+
+
+def sync_dir(path):
+    # makes the renames in the directory durable, directories can't be opened on Windows
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class Region:
+    # a region file opened by Regions.get_region, which creates it first
+    def __init__(self, path):
+        self.is_saved = np.memmap(path, dtype='bool', mode='r+', offset=REGION_HEADER.nbytes,
+                                  shape=REGION_SHAPE)
+        self.voxels = np.memmap(path, dtype='uint8', mode='r+', offset=REGION_DATA_OFFSET,
+                                shape=(*REGION_SHAPE, CHUNK_VOL))
+
+    @staticmethod
+    def is_valid(path):
+        # a region of other world dimensions or of another version of the terrain is generated again
+        if not os.path.exists(path):
+            return False
+        header = np.fromfile(path, dtype='int32', count=len(REGION_HEADER))
+        return np.array_equal(header, REGION_HEADER)
+
+    @staticmethod
+    def create(path):
+        # the file is sparse until the chunks are written
+        with open(path, 'wb') as file:
+            file.write(REGION_HEADER.tobytes())
+            file.truncate(REGION_DATA_OFFSET + math.prod(REGION_SHAPE) * CHUNK_VOL)
+
+    def flush(self):
+        self.voxels.flush()
+        self.is_saved.flush()
+
+
+class Regions:
+    # chunk voxels saved in region files of REGION_SIZE x REGION_SIZE chunk columns.
+    # Chunks are read straight from the memory mapped files, the least recently
+    # used region files are closed first
+    def __init__(self, path=SAVE_DIR, capacity=REGION_CACHE_SIZE):
+        self.path = path
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        # region files are created by the main thread and the autosave thread, never at once,
+        # so neither sees a half written header and truncates a file mapped by the other
+        self.create_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        # chunks of an interrupted write_chunks are written again
+        self.journal_path = os.path.join(path, 'journal.npz')
+        if os.path.exists(self.journal_path):
+            with np.load(self.journal_path) as journal:
+                self.write_chunks(dict(zip(map(tuple, journal['positions'].tolist()), journal['voxels'])))
+
+    def get_path(self, rx, rz):
+        return os.path.join(self.path, f'r.{rx}.{rz}.vrg')
+
+    def get_file(self, rx, rz):
+        # path of the region file, created if it is missing or invalid
+        path = self.get_path(rx, rz)
+        with self.create_lock:
+            if not Region.is_valid(path):
+                Region.create(path)
+        return path
+
+    def get_region(self, rx, rz):
+        region = self.cache.get((rx, rz))
+        if region is None:
+            region = Region(self.get_file(rx, rz))
+            self.cache[rx, rz] = region
+
+            while len(self.cache) > self.capacity:
+                _, evicted = self.cache.popitem(last=False)
+                evicted.flush()
+
+        self.cache.move_to_end((rx, rz))
+        return region
+
+    def get_slot(self, position):
+        # region and index of the chunk in it
+        cx, cy, cz = position
+        region = self.get_region(cx // REGION_SIZE, cz // REGION_SIZE)
+        return region, (cx % REGION_SIZE, cz % REGION_SIZE, cy)
+
+    def load_chunk(self, position):
+        # a view of the voxels in the region file, None if the chunk was never saved
+        region, slot = self.get_slot(position)
+        return region.voxels[slot] if region.is_saved[slot] else None
+
+    def save_chunk(self, position, chunk_voxels):
+        region, slot = self.get_slot(position)
+        # air chunks needn't be written into the holes of a new region file
+        if region.is_saved[slot] or np.any(chunk_voxels):
+            region.voxels[slot] = chunk_voxels
+        region.is_saved[slot] = True
+
+    def flush(self):
+        for region in self.cache.values():
+            region.flush()
+
+    def write_chunks(self, chunks):
+        # saves the chunks {position: voxels} with file writes instead of the memory maps,
+        # so that it can run on another thread. They are journaled first: the journal is
+        # replaced atomically, and removed once all the chunks are in the region files.
+        # Returns the number of bytes written
+        positions = np.array(list(chunks), dtype='int64')
+        voxels = np.array(list(chunks.values()), dtype='uint8')
+        with open(self.journal_path + '.tmp', 'wb') as file:
+            np.savez(file, positions=positions, voxels=voxels)
+            file.flush()
+            os.fsync(file.fileno())
+            num_bytes = file.tell()
+        os.replace(self.journal_path + '.tmp', self.journal_path)
+        sync_dir(self.path)
+
+        regions = {}
+        for (cx, cy, cz), chunk_voxels in zip(positions.tolist(), voxels):
+            regions.setdefault((cx // REGION_SIZE, cz // REGION_SIZE), []).append(
+                ((cx % REGION_SIZE, cz % REGION_SIZE, cy), chunk_voxels))
+
+        for (rx, rz), region_chunks in regions.items():
+            with open(self.get_file(rx, rz), 'r+b') as file:
+                for slot, chunk_voxels in region_chunks:
+                    index = np.ravel_multi_index(slot, REGION_SHAPE)
+                    file.seek(REGION_DATA_OFFSET + index * CHUNK_VOL)
+                    num_bytes += file.write(chunk_voxels.tobytes())
+                    file.seek(REGION_HEADER.nbytes + index)
+                    num_bytes += file.write(b'\x01')
+                file.flush()
+                os.fsync(file.fileno())
+
+        os.remove(self.journal_path)
+        return num_bytes
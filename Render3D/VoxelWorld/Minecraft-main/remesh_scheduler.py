@@ -0,0 +1,56 @@
+import time
+from settings import *
+
+
+class RemeshScheduler:
+    # edited chunks wait here until their dirty slabs are remeshed. Repeated edits of a chunk
+    # are merged into one remesh, and the chunks nearest to the camera are remeshed first,
+    # as many as fit in the time budget of the frame
+    def __init__(self, world, budget=REMESH_BUDGET):
+        self.app = world.app
+        self.budget = budget * 0.001
+        # chunk -> time of its first pending edit
+        self.pending = {}
+
+        # counters for tuning the budget, latencies in ms
+        self.max_queue_depth = 0
+        self.num_remeshes = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    @property
+    def queue_depth(self):
+        return len(self.pending)
+
+    @property
+    def avg_latency(self):
+        return self.total_latency / self.num_remeshes if self.num_remeshes else 0.0
+
+    def add(self, chunk):
+        self.pending.setdefault(chunk, time.perf_counter())
+        self.max_queue_depth = max(self.max_queue_depth, len(self.pending))
+
+    def update(self):
+        if not self.pending:
+            return
+
+        position = self.app.player.position
+        chunks = sorted(self.pending, key=lambda chunk: glm.distance2(chunk.center, position))
+
+        start = time.perf_counter()
+        for chunk in chunks:
+            # at least one chunk per frame, so that the queue always drains
+            if chunk is not chunks[0] and time.perf_counter() - start > self.budget:
+                break
+
+            edit_time = self.pending.pop(chunk)
+            # chunks moved by the streaming since the edit got a new mesh
+            if not (chunk.mesh and chunk.mesh.dirty_slabs):
+                continue
+            chunk.mesh.rebuild()
+
+            self.last_latency = (time.perf_counter() - edit_time) * 1000
+            self.max_latency = max(self.max_latency, self.last_latency)
+            self.total_latency += self.last_latency
+            self.num_remeshes += 1
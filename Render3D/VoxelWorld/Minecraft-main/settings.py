@@ -1,8 +1,43 @@
-from numba import njit
+import os
+import functools
+import numba
 import numpy as np
 import glm
 import math
 
+# compiled kernels
+JIT_CACHE = True  # save the compiled kernels on disk, so only the first start compiles them
+
+
+def _get_source_hash():
+    # the kernels inline the settings and the kernels of the other modules, which the numba
+    # cache does not track, so the cache is kept per version of the project sources
+    import glob
+    import hashlib
+
+    source_hash = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '**', '*.py'), recursive=True)):
+        with open(path, 'rb') as file:
+            source_hash.update(file.read())
+    return source_hash.hexdigest()[:16]
+
+
+def _get_cache_dir():
+    # the caches of older versions of the sources are removed when a new one is made
+    import shutil
+
+    cache_root = os.path.join(os.path.dirname(__file__), '__pycache__', 'numba')
+    cache_dir = os.path.join(cache_root, _get_source_hash())
+    if not os.path.isdir(cache_dir) and os.path.isdir(cache_root):
+        for entry in os.scandir(cache_root):
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return cache_dir
+
+
+if JIT_CACHE and not numba.config.CACHE_DIR:
+    numba.config.CACHE_DIR = _get_cache_dir()
+njit = functools.partial(numba.njit, cache=JIT_CACHE)
+
 # OpenGL settings
 MAJOR_VER, MINOR_VER = 3, 3
 DEPTH_SIZE = 24
@@ -23,15 +58,52 @@ H_CHUNK_SIZE = CHUNK_SIZE // 2
 CHUNK_AREA = CHUNK_SIZE * CHUNK_SIZE
 CHUNK_VOL = CHUNK_AREA * CHUNK_SIZE
 CHUNK_SPHERE_RADIUS = H_CHUNK_SIZE * math.sqrt(3)
+# chunk with a one voxel border from its neighbours
+PADDED_SIZE = CHUNK_SIZE + 2
+PADDED_AREA = PADDED_SIZE * PADDED_SIZE
 
-# world
-WORLD_W, WORLD_H = 20, 2
+# world (streamed window of chunks around the player)
+CHUNK_RADIUS = 9  # chunks meshed and rendered around the player
+WORLD_W, WORLD_H = 2 * CHUNK_RADIUS + 2, 2
 WORLD_D = WORLD_W
 WORLD_AREA = WORLD_W * WORLD_D
 WORLD_VOL = WORLD_AREA * WORLD_H
 
-# world center
-CENTER_XZ = WORLD_W * H_CHUNK_SIZE
+# chunk meshing: 'default' (a quad per voxel face), 'greedy' (merged faces) or 'binary'
+# (the greedy mesh, with the visible faces found from bit columns of the voxels)
+CHUNK_MESHER = 'default'
+# chunk vbo: 'vertices' (6 packed vertices per face) or 'faces' (a 64 bit record per face,
+# expanded to a quad by the vertex shader)
+CHUNK_MESH_FORMAT = 'vertices'
+CHUNK_SLAB_SIZE = 8  # voxel layers remeshed together after an edit
+CHUNK_SLABS = math.ceil(CHUNK_SIZE / CHUNK_SLAB_SIZE)
+CHUNK_MESH_SLACK = 576  # spare vertices in the arena range of a chunk mesh for edits
+CHUNK_ARENA_SIZE = 64  # MB, initial size of the vbo shared by the chunk meshes
+CHUNK_ARENA_MAX_SIZE = 1024  # MB
+REMESH_BUDGET = 4  # ms of remeshing edited chunks per frame
+OCCLUSION_CULLING = True  # skip the chunks hidden behind terrain, e.g. in caves
+LOD_DISTANCES = (4, 6, 8)  # chunks from the player of the 2x, 4x and 8x downsampled meshes
+MESH_THREADS = os.cpu_count() or 1  # threads meshing the chunks loaded together
+
+# chunk streaming
+CHUNK_LOAD_BUDGET = 2  # chunks generated or meshed per frame
+FAST_START = True  # build only the chunks around the player before the first frame, the rest while loading
+FAST_START_RADIUS = 2  # chunks meshed before the first frame
+LOADING_BUDGET = 8  # chunks generated or meshed per frame while loading
+HEIGHTMAP_CACHE_SIZE = 2 * WORLD_AREA  # chunk columns
+VOXEL_POOL_SIZE = 32  # MB, initial size of the pool of the packed and dense chunk voxels
+
+# world saving
+SAVE_DIR = f'saves/seed_{SEED}'  # region files of the generated and edited chunks
+REGION_SIZE = 8  # chunk columns along x and z of a region file
+REGION_CACHE_SIZE = 16  # region files kept open
+AUTOSAVE_INTERVAL = 10  # seconds between the saves of the edited chunks
+MESH_CACHE = True  # save the chunk meshes to skip meshing the unchanged chunks on the next start
+MESH_CACHE_DIR = 'saves/mesh_cache'
+MESH_CACHE_MAX_SIZE = 512  # MB, the least recently used meshes are removed on start beyond it
+
+# world center (the island is 20 chunks wide)
+CENTER_XZ = 20 * H_CHUNK_SIZE
 CENTER_Y = WORLD_H * H_CHUNK_SIZE
 
 # camera
@@ -49,6 +121,7 @@ PLAYER_ROT_SPEED = 0.003
 # PLAYER_POS = glm.vec3(CENTER_XZ, WORLD_H * CHUNK_SIZE, CENTER_XZ)
 PLAYER_POS = glm.vec3(CENTER_XZ, CHUNK_SIZE, CENTER_XZ)
 MOUSE_SENSITIVITY = 0.002
+PLAYER_SPAWN_HEIGHT = 2  # above the ground
 
 # colors
 BG_COLOR = glm.vec3(0.58, 0.83, 0.99)
@@ -74,6 +147,12 @@ TREE_PROBABILITY = 0.02
 TREE_WIDTH, TREE_HEIGHT = 4, 8
 TREE_H_WIDTH, TREE_H_HEIGHT = TREE_WIDTH // 2, TREE_HEIGHT // 2
 
+# caves
+CAVE_NOISE_STEP = 4  # voxels between the cave noise samples, interpolated in between
+# the lattice of the samples must end on the chunk border, carve_caves reads past it otherwise
+if CHUNK_SIZE % CAVE_NOISE_STEP:
+    raise ValueError('CAVE_NOISE_STEP must divide CHUNK_SIZE')
+
 # water
 WATER_LINE = 5.6
 WATER_AREA = 5 * CHUNK_SIZE * WORLD_W
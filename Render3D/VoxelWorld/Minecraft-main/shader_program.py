@@ -8,6 +8,7 @@ class ShaderProgram:
         self.player = app.player
         # -------- shaders -------- #
         self.chunk = self.get_program(shader_name='chunk')
+        self.chunk_faces = self.get_program(shader_name='chunk_faces', fragment_shader_name='chunk')
         self.voxel_marker = self.get_program(shader_name='voxel_marker')
         self.water = self.get_program('water')
         self.clouds = self.get_program('clouds')
@@ -16,11 +17,11 @@ class ShaderProgram:
 
     def set_uniforms_on_init(self):
         # chunk
-        self.chunk['m_proj'].write(self.player.m_proj)
-        self.chunk['m_model'].write(glm.mat4())
-        self.chunk['u_texture_array_0'] = 1
-        self.chunk['bg_color'].write(BG_COLOR)
-        self.chunk['water_line'] = WATER_LINE
+        for chunk in (self.chunk, self.chunk_faces):
+            chunk['m_proj'].write(self.player.m_proj)
+            chunk['u_texture_array_0'] = 1
+            chunk['bg_color'].write(BG_COLOR)
+            chunk['water_line'] = WATER_LINE
 
         # marker
         self.voxel_marker['m_proj'].write(self.player.m_proj)
@@ -41,15 +42,16 @@ class ShaderProgram:
 
     def update(self):
         self.chunk['m_view'].write(self.player.m_view)
+        self.chunk_faces['m_view'].write(self.player.m_view)
         self.voxel_marker['m_view'].write(self.player.m_view)
         self.water['m_view'].write(self.player.m_view)
         self.clouds['m_view'].write(self.player.m_view)
 
-    def get_program(self, shader_name):
+    def get_program(self, shader_name, fragment_shader_name=None):
         with open(f'shaders/{shader_name}.vert') as file:
             vertex_shader = file.read()
 
-        with open(f'shaders/{shader_name}.frag') as file:
+        with open(f'shaders/{fragment_shader_name or shader_name}.frag') as file:
             fragment_shader = file.read()
 
         program = self.ctx.program(vertex_shader=vertex_shader, fragment_shader=fragment_shader)
@@ -18,10 +18,10 @@ flat in int voxel_id;
 
 
 void main() {
-    vec2 face_uv = uv;
-    face_uv.x = uv.x / 3.0 - min(face_id, 2) / 3.0;
+    // 3 layers per voxel: top, side, bottom
+    int tex_id = voxel_id * 3 + (3 - min(face_id, 2)) % 3;
 
-    vec3 tex_col = texture(u_texture_array_0, vec3(face_uv, voxel_id)).rgb;
+    vec3 tex_col = texture(u_texture_array_0, vec3(uv, tex_id)).rgb;
     tex_col = pow(tex_col, gamma);
 
     tex_col *= shading;
@@ -1,6 +1,7 @@
 #version 330 core
 
 layout (location = 0) in uint packed_data;
+layout (location = 1) in vec3 in_chunk_origin;  // per chunk
 
 int x, y, z;
 int ao_id;
@@ -8,7 +9,6 @@ int flip_id;
 
 uniform mat4 m_proj;
 uniform mat4 m_view;
-uniform mat4 m_model;
 
 flat out int voxel_id;
 flat out int face_id;
@@ -26,18 +26,6 @@ const float face_shading[6] = float[6](
     0.5, 0.8   // front back
 );
 
-const vec2 uv_coords[4] = vec2[4](
-    vec2(0, 0), vec2(0, 1),
-    vec2(1, 0), vec2(1, 1)
-);
-
-const int uv_indices[24] = int[24](
-    1, 0, 2, 1, 2, 3,  // tex coords indices for vertices of an even face
-    3, 0, 2, 3, 1, 0,  // odd face
-    3, 1, 0, 3, 0, 2,  // even flipped face
-    1, 2, 3, 1, 0, 2   // odd flipped face
-);
-
 
 vec3 hash31(float p) {
     vec3 p3 = fract(vec3(p * 21.2) * vec3(0.1031, 0.1030, 0.0973));
@@ -46,6 +34,15 @@ vec3 hash31(float p) {
 }
 
 
+vec2 get_uv(vec3 pos) {
+    // tex coords follow the voxel grid, so the texture tiles across merged faces
+    float u_sign = (face_id & 1) == 0 ? 1.0 : -1.0;
+    if (face_id < 2) return vec2(pos.x * u_sign, -pos.z);  // top bottom
+    if (face_id < 4) return vec2(pos.z * u_sign, -pos.y);  // right left
+    return vec2(pos.x * u_sign, -pos.y);                   // back front
+}
+
+
 void unpack(uint packed_data) {
     // a, b, c, d, e, f, g = x, y, z, voxel_id, face_id, ao_id, flip_id
     uint b_bit = 6u, c_bit = 6u, d_bit = 8u, e_bit = 3u, f_bit = 2u, g_bit = 1u;
@@ -72,13 +69,12 @@ void main() {
     unpack(packed_data);
 
     vec3 in_position = vec3(x, y, z);
-    int uv_index = gl_VertexID % 6  + ((face_id & 1) + flip_id * 2) * 6;
 
-    uv = uv_coords[uv_indices[uv_index]];
+    uv = get_uv(in_position);
 
     shading = face_shading[face_id] * ao_values[ao_id];
 
-    frag_world_pos = (m_model * vec4(in_position, 1.0)).xyz;
+    frag_world_pos = in_chunk_origin + in_position;
 
     gl_Position = m_proj * m_view * vec4(frag_world_pos, 1.0);
 }
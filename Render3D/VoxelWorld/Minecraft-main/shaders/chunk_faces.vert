@@ -0,0 +1,94 @@
+#version 330 core
+
+layout (location = 0) in uvec2 face_data;  // per face instance
+layout (location = 1) in vec3 in_chunk_origin;  // per chunk, for each of the 6 vertices of its draw
+
+int d, u, v, w, h;
+int ao[4];
+int flip_id;
+
+uniform mat4 m_proj;
+uniform mat4 m_view;
+
+flat out int voxel_id;
+flat out int face_id;
+
+out vec2 uv;
+out float shading;
+out vec3 frag_world_pos;
+
+const float ao_values[4] = float[4](0.1, 0.25, 0.5, 1.0);
+
+const float face_shading[6] = float[6](
+    1.0, 0.5,  // top bottom
+    0.5, 0.8,  // right left
+    0.5, 0.8   // front back
+);
+
+// corners v0..v3 of the two triangles of a face, the same as add_quad of the mesh builder:
+// by the top, bottom, right or back, left or front faces, and flip_id
+const int quad_corners[48] = int[48](
+    0, 3, 2, 0, 2, 1,  1, 0, 3, 1, 3, 2,
+    0, 2, 3, 0, 1, 2,  1, 3, 0, 1, 2, 3,
+    0, 1, 2, 0, 2, 3,  3, 0, 1, 3, 1, 2,
+    0, 2, 1, 0, 3, 2,  3, 1, 0, 3, 2, 1
+);
+
+// the corners in the slice coords u, v of the face
+const ivec2 corner_offsets[4] = ivec2[4](ivec2(0, 0), ivec2(1, 0), ivec2(1, 1), ivec2(0, 1));
+
+const int quad_groups[6] = int[6](0, 1, 2, 3, 2, 3);
+
+
+vec2 get_uv(vec3 pos) {
+    // tex coords follow the voxel grid, so the texture tiles across merged faces
+    float u_sign = (face_id & 1) == 0 ? 1.0 : -1.0;
+    if (face_id < 2) return vec2(pos.x * u_sign, -pos.z);  // top bottom
+    if (face_id < 4) return vec2(pos.z * u_sign, -pos.y);  // right left
+    return vec2(pos.x * u_sign, -pos.y);                   // back front
+}
+
+
+vec3 get_slice_pos(int plane, int su, int sv) {
+    // slice coords -> local position, as get_slice_pos of the mesh builder
+    int axis = face_id / 2;
+    if (axis == 0) return vec3(su, plane, sv);
+    if (axis == 1) return vec3(plane, su, sv);
+    return vec3(sv, su, plane);
+}
+
+
+void unpack(uvec2 face_data) {
+    // d, u, v, w, h: 6bit each  |  voxel_id: 8bit  face_id: 3bit  ao0..ao3: 2bit each
+    d = int(face_data.x & 63u);
+    u = int((face_data.x >> 6u) & 63u);
+    v = int((face_data.x >> 12u) & 63u);
+    w = int((face_data.x >> 18u) & 63u);
+    h = int((face_data.x >> 24u) & 63u);
+    //
+    voxel_id = int(face_data.y & 255u);
+    face_id = int((face_data.y >> 8u) & 7u);
+    for (int i = 0; i < 4; i++) {
+        ao[i] = int((face_data.y >> uint(11 + 2 * i)) & 3u);
+    }
+    flip_id = int(ao[1] + ao[3] > ao[0] + ao[2]);
+}
+
+
+void main() {
+    unpack(face_data);
+
+    // the draws start at a multiple of 6, so this is the vertex of the quad
+    int corner = quad_corners[(quad_groups[face_id] * 2 + flip_id) * 6 + gl_VertexID % 6];
+    ivec2 offset = corner_offsets[corner] * ivec2(w, h);
+
+    vec3 in_position = get_slice_pos(d, u + offset.x, v + offset.y);
+
+    uv = get_uv(in_position);
+
+    shading = face_shading[face_id] * ao_values[ao[corner]];
+
+    frag_world_pos = in_chunk_origin + in_position;
+
+    gl_Position = m_proj * m_view * vec4(frag_world_pos, 1.0);
+}
@@ -1,7 +1,37 @@
 from noise import noise2, noise3
-from random import random
+from numba import prange
 from settings import *
 
+# part of the region file header, to be increased when the generated terrain changes,
+# as the saved chunks of older versions wouldn't match the newly generated ones
+TERRAIN_VERSION = 4
+
+# salts of the random numbers drawn at the same voxel
+SURFACE_SALT, TREE_SALT, LEAVES_SALT = 1, 2, 3
+
+
+@njit
+def hash32(h):
+    # 32 bit integer hash (lowbias32), in int64 arithmetic masked to 32 bits
+    h &= 0xFFFFFFFF
+    h ^= h >> 16
+    h = h * 0x7FEB352D & 0xFFFFFFFF
+    h ^= h >> 15
+    h = h * 0x846CA68B & 0xFFFFFFFF
+    h ^= h >> 16
+    return h
+
+
+@njit
+def get_random(wx, wy, wz, salt):
+    # random number in [0, 1) from the seed and the world position of a voxel, so that
+    # a chunk is the same whatever the order or the thread it is generated in
+    h = hash32(SEED ^ hash32(salt))
+    h = hash32(h ^ wx)
+    h = hash32(h ^ wy)
+    h = hash32(h ^ wz)
+    return h / 4294967296.0
+
 
 @njit
 def get_height(x, z):
@@ -32,53 +62,137 @@ def get_height(x, z):
     return int(height)
 
 
+@njit(parallel=True)
+def generate_heightmaps(heightmaps, columns):
+    # surface height of every voxel column of the chunk columns x, z
+    for i in prange(len(columns)):
+        cx = columns[i, 0] * CHUNK_SIZE
+        cz = columns[i, 1] * CHUNK_SIZE
+        for x in range(CHUNK_SIZE):
+            for z in range(CHUNK_SIZE):
+                heightmaps[i, x, z] = get_height(cx + x, cz + z)
+
+
+@njit(parallel=True)
+def generate_chunks(world_voxels, chunk_indices, chunk_positions, heightmaps, heightmap_indices,
+                    cave_step=CAVE_NOISE_STEP):
+    # chunks don't depend on each other, so they are generated on all cores
+    for i in prange(len(chunk_indices)):
+        voxels = world_voxels[chunk_indices[i]]
+        voxels[:] = 0
+
+        cx = chunk_positions[i, 0] * CHUNK_SIZE
+        cy = chunk_positions[i, 1] * CHUNK_SIZE
+        cz = chunk_positions[i, 2] * CHUNK_SIZE
+        generate_terrain(voxels, cx, cy, cz, heightmaps[heightmap_indices[i]], cave_step)
+
+
 @njit
-def get_index(x, y, z):
-    return x + CHUNK_SIZE * z + CHUNK_AREA * y
+def generate_terrain(voxels, cx, cy, cz, heightmap, cave_step):
+    max_height = min(heightmap.max() - cy, CHUNK_SIZE)
+    if max_height <= 0:
+        return
+    cave_noise = get_cave_noise(cx, cy, cz, max_height, cave_step)
+    column_noise = np.empty(len(cave_noise))
+
+    for x in range(CHUNK_SIZE):
+        wx = x + cx
+        for z in range(CHUNK_SIZE):
+            wz = z + cz
+            world_height = heightmap[x, z]
+
+            # stone up to the surface voxel, as a run of the column, with the caves carved out
+            stone_height = min(world_height - 1 - cy, CHUNK_SIZE)
+            if stone_height > 0:
+                column = get_index(x, 0, z)
+                voxels[column:column + CHUNK_AREA * stone_height:CHUNK_AREA] = STONE
+                carve_caves(voxels, x, z, cy, wx, wz, world_height, stone_height, cave_noise, cave_step, column_noise)
+
+            # surface voxel
+            y = world_height - 1 - cy
+            if 0 <= y < CHUNK_SIZE:
+                set_surface_voxel(voxels, x, y, z, wx, y + cy, wz, world_height)
 
 
 @njit
-def set_voxel_id(voxels, x, y, z, wx, wy, wz, world_height):
-    voxel_id = 0
+def carve_caves(voxels, x, z, cy, wx, wz, world_height, stone_height, cave_noise, cave_step, column_noise):
+    # caves are between the cave floor and 10 voxels below the surface
+    y_max = min(world_height - 10 - cy, stone_height)
+    if y_max <= 0:
+        return
+    cave_floor = noise2(wx * 0.1, wz * 0.1) * 3 + 3
+    y_min = max(math.floor(cave_floor) + 1 - cy, 0)
+    if y_min >= y_max:
+        return
+
+    # the cave noise of the lattice layers interpolated at the column, then along it
+    fx, fz = (x % cave_step) / cave_step, (z % cave_step) / cave_step
+    ix, iz = x // cave_step, z // cave_step
+    for iy in range(y_min // cave_step, (y_max - 1) // cave_step + 2):
+        c0 = cave_noise[ix, iy, iz    ] * (1 - fx) + cave_noise[ix + 1, iy, iz    ] * fx
+        c1 = cave_noise[ix, iy, iz + 1] * (1 - fx) + cave_noise[ix + 1, iy, iz + 1] * fx
+        column_noise[iy] = c0 * (1 - fz) + c1 * fz
+
+    for y in range(y_min, y_max):
+        iy, fy = y // cave_step, (y % cave_step) / cave_step
+        if column_noise[iy] * (1 - fy) + column_noise[iy + 1] * fy > 0:
+            voxels[get_index(x, y, z)] = 0
 
-    if wy < world_height - 1:
-        # create caves
-        if (noise3(wx * 0.09, wy * 0.09, wz * 0.09) > 0 and
-                noise2(wx * 0.1, wz * 0.1) * 3 + 3 < wy < world_height - 10):
-            voxel_id = 0
 
-        else:
-            voxel_id = STONE
-    else:
-        rng = int(7 * random())
-        ry = wy - rng
-        if SNOW_LVL <= ry < world_height:
-            voxel_id = SNOW
+@njit
+def get_cave_noise(cx, cy, cz, max_height, step):
+    # the cave noise on a lattice of the world positions every step voxels, which
+    # carve_caves interpolates trilinearly. Only up to the highest surface voxel of the chunk
+    size = CHUNK_SIZE // step + 1
+    num_layers = min((max_height - 1) // step + 2, size)
+    cave_noise = np.empty((size, size, size), dtype=np.float64)
+
+    for ix in range(size):
+        wx = cx + ix * step
+        for iy in range(num_layers):
+            wy = cy + iy * step
+            for iz in range(size):
+                wz = cz + iz * step
+                cave_noise[ix, iy, iz] = noise3(wx * 0.09, wy * 0.09, wz * 0.09)
+    return cave_noise
 
-        elif STONE_LVL <= ry < SNOW_LVL:
-            voxel_id = STONE
 
-        elif DIRT_LVL <= ry < STONE_LVL:
-            voxel_id = DIRT
+@njit
+def get_index(x, y, z):
+    return x + CHUNK_SIZE * z + CHUNK_AREA * y
 
-        elif GRASS_LVL <= ry < DIRT_LVL:
-            voxel_id = GRASS
 
-        else:
-            voxel_id = SAND
+@njit
+def set_surface_voxel(voxels, x, y, z, wx, wy, wz, world_height):
+    # the material of the surface by its height, jittered by up to 6 voxels
+    rng = int(7 * get_random(wx, wy, wz, SURFACE_SALT))
+    ry = wy - rng
+    if SNOW_LVL <= ry < world_height:
+        voxel_id = SNOW
+
+    elif STONE_LVL <= ry < SNOW_LVL:
+        voxel_id = STONE
+
+    elif DIRT_LVL <= ry < STONE_LVL:
+        voxel_id = DIRT
+
+    elif GRASS_LVL <= ry < DIRT_LVL:
+        voxel_id = GRASS
+
+    else:
+        voxel_id = SAND
 
     # setting ID
     voxels[get_index(x, y, z)] = voxel_id
 
     # place tree
     if wy < DIRT_LVL:
-        place_tree(voxels, x, y, z, voxel_id)
+        place_tree(voxels, x, y, z, wx, wy, wz, voxel_id)
 
 
 @njit
-def place_tree(voxels, x, y, z, voxel_id):
-    rnd = random()
-    if voxel_id != GRASS or rnd > TREE_PROBABILITY:
+def place_tree(voxels, x, y, z, wx, wy, wz, voxel_id):
+    if voxel_id != GRASS or get_random(wx, wy, wz, TREE_SALT) > TREE_PROBABILITY:
         return None
     if y + TREE_HEIGHT >= CHUNK_SIZE:
         return None
@@ -94,7 +208,7 @@ def place_tree(voxels, x, y, z, voxel_id):
     m = 0
     for n, iy in enumerate(range(TREE_H_HEIGHT, TREE_HEIGHT - 1)):
         k = iy % 2
-        rng = int(random() * 2)
+        rng = int(get_random(wx, wy + iy, wz, LEAVES_SALT) * 2)
         for ix in range(-TREE_H_WIDTH + m, TREE_H_WIDTH - m * rng):
             for iz in range(-TREE_H_WIDTH + m * rng, TREE_H_WIDTH - m):
                 if (ix + iz) % 4:
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from settings import PADDED_SIZE
+from meshes.chunk_mesh_builder import CHUNK_MESHERS, get_mesh_data, get_face_data, get_slice_pos
+
+
+def get_padded_voxels(seed=0):
+    # random terrain of a few voxel ids, solid at the bottom
+    rng = np.random.default_rng(seed)
+    padded_voxels = rng.integers(1, 4, PADDED_SIZE ** 3).astype('uint8')
+    padded_voxels[rng.random(PADDED_SIZE ** 3) < np.linspace(0, 1, PADDED_SIZE ** 3)] = 0
+    return padded_voxels
+
+
+def unpack_vertex(packed_data):
+    # x, y, z, voxel_id, face_id, ao_id of the packed vertex data
+    packed_data = int(packed_data)
+    return (packed_data >> 26, packed_data >> 20 & 63, packed_data >> 14 & 63,
+            packed_data >> 6 & 255, packed_data >> 3 & 7, packed_data >> 1 & 3)
+
+
+def unpack_face(face_data):
+    face_data = int(face_data)
+    d, u, v, w, h = (face_data >> shift & 63 for shift in (0, 6, 12, 18, 24))
+    high = face_data >> 32
+    ao = [high >> (11 + 2 * i) & 3 for i in range(4)]
+    return d, u, v, w, h, high & 255, high >> 8 & 7, ao
+
+
+@pytest.mark.parametrize('mesher', ['default', 'greedy', 'binary'])
+def test_face_data_matches_the_quads(mesher):
+    vertex_data = get_mesh_data(CHUNK_MESHERS[mesher], get_padded_voxels(), 1)
+    face_data = get_face_data(vertex_data)
+    assert len(vertex_data) and len(face_data) * 6 == len(vertex_data)
+
+    for face, record in enumerate(face_data):
+        vertices = [unpack_vertex(packed_data) for packed_data in vertex_data[6 * face:6 * face + 6]]
+        d, u, v, w, h, voxel_id, face_id, ao = unpack_face(record)
+        assert (voxel_id, face_id) == vertices[0][3:5]
+
+        # the corners (0, 0), (1, 0), (1, 1), (0, 1) of the face and their ao
+        corners = [(u, v), (u + w, v), (u + w, v + h), (u, v + h)]
+        expected = {(*get_slice_pos(face_id // 2, d, cu, cv), ao[i]) for i, (cu, cv) in enumerate(corners)}
+        assert {(x, y, z, ao_id) for x, y, z, _, _, ao_id in vertices} == expected
+
+
+def test_binary_mesh_is_the_greedy_mesh():
+    padded_voxels = get_padded_voxels(1)
+    greedy = get_mesh_data(CHUNK_MESHERS['greedy'], padded_voxels, 1)
+    assert np.array_equal(get_mesh_data(CHUNK_MESHERS['binary'], padded_voxels, 1), greedy)
+    # merged faces, never more vertices than a quad per voxel face
+    assert len(greedy) <= len(get_mesh_data(CHUNK_MESHERS['default'], padded_voxels, 1))
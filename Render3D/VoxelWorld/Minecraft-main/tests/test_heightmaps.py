@@ -0,0 +1,33 @@
+import numpy as np
+from settings import CHUNK_SIZE
+from heightmaps import HeightMaps
+from terrain_gen import generate_heightmaps
+
+
+def test_heightmaps_match_the_generator():
+    columns = [(9, 10), (10, 10)]
+    expected = np.empty([len(columns), CHUNK_SIZE, CHUNK_SIZE], dtype='int32')
+    generate_heightmaps(expected, np.array(columns))
+    assert np.array_equal(HeightMaps().get_heightmaps(columns), expected)
+
+
+def test_columns_are_shared():
+    heightmaps = HeightMaps()
+    first = heightmaps.get_heightmap(10, 10)
+    assert heightmaps.get_heightmaps([(10, 10), (10, 10)])[1] is first
+    assert len(heightmaps.cache) == 1
+
+
+def test_least_recently_used_columns_are_evicted():
+    heightmaps = HeightMaps(capacity=2)
+    heightmaps.get_heightmaps([(0, 0), (1, 0)])
+    # (0, 0) becomes the most recently used
+    heightmaps.get_heightmap(0, 0)
+    heightmaps.get_heightmap(2, 0)
+    assert list(heightmaps.cache) == [(0, 0), (2, 0)]
+
+
+def test_get_height():
+    heightmaps = HeightMaps()
+    x, z = 10 * CHUNK_SIZE + 5, 11 * CHUNK_SIZE + 7
+    assert heightmaps.get_height(x, z) == heightmaps.get_heightmap(10, 11)[5, 7]
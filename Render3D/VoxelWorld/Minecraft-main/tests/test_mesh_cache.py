@@ -0,0 +1,52 @@
+import os
+import time
+import numpy as np
+from settings import PADDED_SIZE
+from meshes.mesh_cache import MeshCache
+
+
+def test_round_trip(tmp_path):
+    cache = MeshCache(path=str(tmp_path))
+    padded_voxels = np.zeros(PADDED_SIZE ** 3, dtype='uint8')
+    key = cache.get_key(padded_voxels)
+    assert cache.load(key) is None
+
+    slabs = [np.arange(12, dtype='uint32'), np.empty(0, dtype='uint32'), np.arange(6, dtype='uint32') * 7]
+    cache.save(key, slabs, -5)
+    cached_slabs, connections = cache.load(key)
+    assert connections == -5
+    assert len(cached_slabs) == len(slabs)
+    for cached, vertex_data in zip(cached_slabs, slabs):
+        assert np.array_equal(cached, vertex_data)
+
+
+def test_face_records(tmp_path):
+    cache = MeshCache(path=str(tmp_path), dtype='uint64')
+    slabs = [np.array([1 << 40, 3], dtype='uint64')]
+    cache.save('key', slabs, 0)
+    cached_slabs, _ = cache.load('key')
+    assert cached_slabs[0].dtype == np.uint64
+    assert np.array_equal(cached_slabs[0], slabs[0])
+
+
+def test_keys_depend_on_the_voxels_and_lod(tmp_path):
+    cache = MeshCache(path=str(tmp_path))
+    padded_voxels = np.zeros(PADDED_SIZE ** 3, dtype='uint8')
+    key = cache.get_key(padded_voxels)
+    assert cache.get_key(padded_voxels, lod=1) != key
+
+    padded_voxels[100] = 1
+    assert cache.get_key(padded_voxels) != key
+
+
+def test_prune_removes_least_recently_used(tmp_path):
+    cache = MeshCache(path=str(tmp_path))
+    slabs = [np.zeros(256, dtype='uint32')]
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.save(key, slabs, 0)
+        os.utime(cache.get_path(key), (time.time() + i, time.time() + i))
+    open(os.path.join(str(tmp_path), 'd.mesh.1.tmp'), 'wb').close()
+
+    entry_size = os.path.getsize(cache.get_path('a'))
+    assert cache.prune(2 * entry_size) == 2
+    assert sorted(os.listdir(str(tmp_path))) == ['b.mesh', 'c.mesh']
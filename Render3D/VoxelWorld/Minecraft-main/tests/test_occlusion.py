@@ -0,0 +1,46 @@
+import numpy as np
+from settings import CHUNK_SIZE, CHUNK_AREA, CHUNK_VOL
+from occlusion import get_face_connections, changes_connections, ALL_CONNECTED
+
+
+def get_index(x, y, z):
+    return x + CHUNK_SIZE * z + CHUNK_AREA * y
+
+
+def test_air_chunk_is_all_connected():
+    assert get_face_connections(np.zeros(CHUNK_VOL, dtype='uint8')) == ALL_CONNECTED
+
+
+def test_solid_chunk_has_no_connections():
+    assert get_face_connections(np.ones(CHUNK_VOL, dtype='uint8')) == 0
+
+
+def test_floor_separates_top_and_bottom():
+    chunk_voxels = np.zeros(CHUNK_VOL, dtype='uint8')
+    chunk_voxels[CHUNK_AREA * 10:CHUNK_AREA * 11] = 1
+    connections = get_face_connections(chunk_voxels)
+    # top 0, bottom 1, right 2
+    assert not connections >> (0 * 6 + 1) & 1
+    assert connections >> (0 * 6 + 2) & 1
+    assert connections >> (1 * 6 + 2) & 1
+
+
+def test_skipped_edits_keep_the_connections():
+    rng = np.random.default_rng(0)
+    chunk_voxels = (rng.random(CHUNK_VOL) < 0.6).astype('uint8')
+    connections = get_face_connections(chunk_voxels)
+
+    for _ in range(200):
+        voxel_index = get_index(*rng.integers(0, CHUNK_SIZE, 3))
+        chunk_voxels[voxel_index] ^= 1
+        if changes_connections(chunk_voxels, voxel_index, connections):
+            connections = get_face_connections(chunk_voxels)
+        else:
+            assert get_face_connections(chunk_voxels) == connections
+
+
+def test_border_edits_change_the_connections():
+    chunk_voxels = np.ones(CHUNK_VOL, dtype='uint8')
+    voxel_index = get_index(0, 5, 5)
+    chunk_voxels[voxel_index] = 0
+    assert changes_connections(chunk_voxels, voxel_index, 0)
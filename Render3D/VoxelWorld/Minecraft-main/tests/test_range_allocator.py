@@ -0,0 +1,58 @@
+from range_allocator import RangeAllocator
+
+
+def test_alloc_first_fit():
+    allocator = RangeAllocator(100)
+    assert allocator.alloc(30) == 0
+    assert allocator.alloc(30) == 30
+    assert allocator.used == 60
+    assert allocator.free_ranges == [(60, 40)]
+
+
+def test_alloc_full():
+    allocator = RangeAllocator(100)
+    assert allocator.alloc(100) == 0
+    assert allocator.free_ranges == []
+    assert allocator.alloc(1) == -1
+    assert allocator.largest_free == 0
+
+
+def test_free_merges_neighbours():
+    allocator = RangeAllocator(100)
+    offsets = [allocator.alloc(20) for _ in range(5)]
+    allocator.free(offsets[1], 20)
+    allocator.free(offsets[3], 20)
+    assert allocator.free_ranges == [(20, 20), (60, 20)]
+
+    # merged with the previous and the next free range
+    allocator.free(offsets[2], 20)
+    assert allocator.free_ranges == [(20, 60)]
+    assert allocator.largest_free == 60
+    assert allocator.used == 40
+
+    allocator.free(offsets[0], 20)
+    allocator.free(offsets[4], 20)
+    assert allocator.free_ranges == [(0, 100)]
+    assert allocator.used == 0
+
+
+def test_alloc_reuses_freed_range():
+    allocator = RangeAllocator(100)
+    first = allocator.alloc(40)
+    allocator.alloc(40)
+    allocator.free(first, 40)
+    assert allocator.alloc(50) == -1
+    assert allocator.alloc(30) == 0
+    assert allocator.free_ranges == [(30, 10), (80, 20)]
+
+
+def test_reset():
+    allocator = RangeAllocator(100)
+    allocator.alloc(10)
+    allocator.reset(200, 60)
+    assert allocator.capacity == 200
+    assert allocator.used == 60
+    assert allocator.free_ranges == [(60, 140)]
+
+    allocator.reset(60, 60)
+    assert allocator.free_ranges == []
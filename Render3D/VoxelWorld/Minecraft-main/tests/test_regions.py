@@ -0,0 +1,56 @@
+import os
+import numpy as np
+from settings import CHUNK_VOL, REGION_SIZE
+from regions import Regions
+
+
+def get_chunks(seed=0):
+    # chunks of two region files, one of them at negative positions
+    rng = np.random.default_rng(seed)
+    positions = [(0, 0, 0), (1, 1, 2), (REGION_SIZE - 1, 0, 3), (-1, 1, -REGION_SIZE)]
+    return {position: rng.integers(0, 8, CHUNK_VOL).astype('uint8') for position in positions}
+
+
+def test_unsaved_chunk(tmp_path):
+    assert Regions(path=str(tmp_path)).load_chunk((0, 0, 0)) is None
+
+
+def test_save_and_load_chunk(tmp_path):
+    regions = Regions(path=str(tmp_path))
+    chunk_voxels = get_chunks()[1, 1, 2]
+    regions.save_chunk((1, 1, 2), chunk_voxels)
+    regions.flush()
+    assert np.array_equal(Regions(path=str(tmp_path)).load_chunk((1, 1, 2)), chunk_voxels)
+
+
+def test_write_chunks(tmp_path):
+    chunks = get_chunks()
+    num_bytes = Regions(path=str(tmp_path)).write_chunks(chunks)
+    assert num_bytes > len(chunks) * CHUNK_VOL
+    assert not os.path.exists(os.path.join(str(tmp_path), 'journal.npz'))
+
+    regions = Regions(path=str(tmp_path))
+    for position, chunk_voxels in chunks.items():
+        assert np.array_equal(regions.load_chunk(position), chunk_voxels)
+
+
+def test_write_chunks_over_mapped_region(tmp_path):
+    # the autosave writes the region files while the main thread has them mapped
+    regions = Regions(path=str(tmp_path))
+    regions.save_chunk((0, 0, 0), np.ones(CHUNK_VOL, dtype='uint8'))
+    chunks = get_chunks()
+    regions.write_chunks(chunks)
+    assert np.array_equal(regions.load_chunk((0, 0, 0)), chunks[0, 0, 0])
+
+
+def test_journal_is_replayed(tmp_path):
+    # a write_chunks interrupted after the journal was written
+    chunks = get_chunks(1)
+    with open(os.path.join(str(tmp_path), 'journal.npz'), 'wb') as file:
+        np.savez(file, positions=np.array(list(chunks), dtype='int64'),
+                 voxels=np.array(list(chunks.values()), dtype='uint8'))
+
+    regions = Regions(path=str(tmp_path))
+    assert not os.path.exists(os.path.join(str(tmp_path), 'journal.npz'))
+    for position, chunk_voxels in chunks.items():
+        assert np.array_equal(regions.load_chunk(position), chunk_voxels)
@@ -0,0 +1,53 @@
+import numpy as np
+from settings import CHUNK_SIZE, CHUNK_VOL, CAVE_NOISE_STEP, WORLD_H, STONE
+from heightmaps import HeightMaps
+from terrain_gen import generate_chunks, generate_terrain
+
+# a small window of chunks at the center of the island
+CHUNK_POSITIONS = np.array([
+    (cx, cy, cz) for cx in range(9, 12) for cy in range(WORLD_H) for cz in range(9, 12)
+])
+
+
+def get_heightmaps():
+    columns = list(dict.fromkeys((cx, cz) for cx, _, cz in CHUNK_POSITIONS.tolist()))
+    heightmaps = np.array(HeightMaps().get_heightmaps(columns))
+    heightmap_indices = np.array([columns.index((cx, cz)) for cx, _, cz in CHUNK_POSITIONS.tolist()])
+    return heightmaps, heightmap_indices
+
+
+def generate_parallel():
+    heightmaps, heightmap_indices = get_heightmaps()
+    voxels = np.empty([len(CHUNK_POSITIONS), CHUNK_VOL], dtype='uint8')
+    generate_chunks(voxels, np.arange(len(CHUNK_POSITIONS)), CHUNK_POSITIONS, heightmaps, heightmap_indices)
+    return voxels
+
+
+def test_parallel_generation_has_terrain():
+    voxels = generate_parallel()
+    assert np.count_nonzero(voxels == STONE)
+    assert np.count_nonzero(voxels == 0)
+
+
+def test_serial_generation_is_identical():
+    heightmaps, heightmap_indices = get_heightmaps()
+    serial = np.zeros([len(CHUNK_POSITIONS), CHUNK_VOL], dtype='uint8')
+    for i, position in enumerate(CHUNK_POSITIONS):
+        cx, cy, cz = position * CHUNK_SIZE
+        generate_terrain(serial[i], cx, cy, cz, heightmaps[heightmap_indices[i]], CAVE_NOISE_STEP)
+
+    assert np.array_equal(generate_parallel(), serial)
+
+
+def test_single_chunk_generation_is_identical_in_any_order():
+    heightmaps, heightmap_indices = get_heightmaps()
+    single = np.empty([len(CHUNK_POSITIONS), CHUNK_VOL], dtype='uint8')
+    for i in np.random.default_rng(0).permutation(len(CHUNK_POSITIONS)):
+        chunk = slice(i, i + 1)
+        generate_chunks(single[chunk], np.arange(1), CHUNK_POSITIONS[chunk], heightmaps, heightmap_indices[chunk])
+
+    assert np.array_equal(generate_parallel(), single)
+
+
+def test_generation_is_repeatable():
+    assert np.array_equal(generate_parallel(), generate_parallel())
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from settings import CHUNK_VOL
+from voxel_store import VoxelStore, DENSE, get_palette, pack_chunk, unpack_chunk
+
+
+def get_chunk_voxels(num_ids, seed=0):
+    rng = np.random.default_rng(seed)
+    voxel_ids = rng.choice(np.arange(1, 256), num_ids, replace=False).astype('uint8')
+    return voxel_ids[rng.integers(0, num_ids, CHUNK_VOL)]
+
+
+@pytest.mark.parametrize('bits', [1, 2, 4])
+def test_pack_unpack(bits):
+    chunk_voxels = get_chunk_voxels(1 << bits)
+    palette = get_palette(chunk_voxels)
+    packed = np.empty(CHUNK_VOL * bits // 8, dtype='uint8')
+    pack_chunk(chunk_voxels, palette, bits, packed)
+
+    unpacked = np.empty(CHUNK_VOL, dtype='uint8')
+    unpack_chunk(packed, palette, bits, unpacked)
+    assert np.array_equal(unpacked, chunk_voxels)
+
+
+@pytest.mark.parametrize('num_ids, bits', [(1, 0), (2, 1), (3, 2), (4, 2), (16, 4), (17, DENSE)])
+def test_set_get_chunk(num_ids, bits):
+    store = VoxelStore(size=2)
+    chunk_voxels = get_chunk_voxels(num_ids)
+    store.set_chunk(1, chunk_voxels)
+    assert store.bits[1] == bits
+    assert np.array_equal(store.get_chunk(1), chunk_voxels)
+
+    voxel_indices = np.random.default_rng(1).integers(0, CHUNK_VOL, 100)
+    assert [store.get_voxel(1, i) for i in voxel_indices] == chunk_voxels[voxel_indices].tolist()
+
+
+def test_empty_chunk():
+    store = VoxelStore(size=1)
+    store.set_chunk(0, np.zeros(CHUNK_VOL, dtype='uint8'))
+    assert store.is_empty(0)
+    assert store.sizes[0] == 0
+
+
+def test_set_voxel_makes_the_chunk_dense():
+    store = VoxelStore(size=1)
+    chunk_voxels = get_chunk_voxels(2)
+    store.set_chunk(0, chunk_voxels)
+    store.set_voxel(0, 10, 7)
+
+    chunk_voxels[10] = 7
+    assert store.bits[0] == DENSE
+    assert np.array_equal(store.get_chunk(0), chunk_voxels)
+
+
+def test_pool_grows():
+    # more dense chunks than fit in the initial pool
+    num_chunks = len(VoxelStore(size=1).pool) // CHUNK_VOL + 2
+    store = VoxelStore(size=num_chunks)
+    chunks = [get_chunk_voxels(32, seed) for seed in range(num_chunks)]
+    for chunk_index, chunk_voxels in enumerate(chunks):
+        store.set_chunk(chunk_index, chunk_voxels)
+        # frees ranges in between, compacted when the pool runs out
+        if chunk_index % 3 == 0:
+            store.set_chunk(chunk_index, np.full(CHUNK_VOL, 1, dtype='uint8'))
+            chunks[chunk_index] = store.get_chunk(chunk_index)
+
+    for chunk_index, chunk_voxels in enumerate(chunks):
+        assert np.array_equal(store.get_chunk(chunk_index), chunk_voxels)
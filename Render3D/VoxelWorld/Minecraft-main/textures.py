@@ -1,5 +1,6 @@
 import pygame as pg
 import moderngl as mgl
+import numpy as np
 
 
 class Textures:
@@ -22,11 +23,17 @@ class Textures:
         texture = pg.transform.flip(texture, flip_x=True, flip_y=False)
 
         if is_tex_array:
-            num_layers = 3 * texture.get_height() // texture.get_width()  # 3 textures per layer
+            # 3 textures per row of the image (top, side, bottom after the flip), each one
+            # gets its own layer so that it can repeat across merged faces
+            size = texture.get_width() // 3
+            num_rows = texture.get_height() // size
+            data = np.frombuffer(pg.image.tostring(texture, 'RGBA'), dtype='uint8')
+            data = data.reshape(num_rows, size, 3, size, 4).swapaxes(1, 2)
+
             texture = self.app.ctx.texture_array(
-                size=(texture.get_width(), texture.get_height() // num_layers, num_layers),
+                size=(size, size, num_rows * 3),
                 components=4,
-                data=pg.image.tostring(texture, 'RGBA')
+                data=np.ascontiguousarray(data)
             )
         else:
             texture = self.ctx.texture(
@@ -1,11 +1,16 @@
 from settings import *
 from meshes.chunk_mesh_builder import get_chunk_index
+from ray_cast import cast_ray, cast_rays, HIT_SIZE
 
 
 class VoxelHandler:
     def __init__(self, world):
         self.app = world.app
+        self.world = world
         self.chunks = world.chunks
+        self.table = world.chunk_table
+        self.voxels = world.voxels
+        self.remesh_scheduler = world.remesh_scheduler
 
         # ray casting result
         self.chunk = None
@@ -14,6 +19,7 @@ class VoxelHandler:
         self.voxel_local_pos = None
         self.voxel_world_pos = None
         self.voxel_normal = None
+        self.hit = np.zeros(HIT_SIZE, dtype='int64')
 
         self.interaction_mode = 0  # 0: remove voxel   1: add voxel
         self.new_voxel_id = DIRT
@@ -25,9 +31,12 @@ class VoxelHandler:
 
             # is the new place empty?
             if not result[0]:
-                _, voxel_index, _, chunk = result
-                chunk.voxels[voxel_index] = self.new_voxel_id
-                chunk.mesh.rebuild()
+                _, voxel_index, voxel_local_pos, chunk = result
+                self.voxels.set_voxel(chunk.index, voxel_index, self.new_voxel_id)
+                chunk.is_modified = True
+                chunk.mesh.set_dirty(voxel_local_pos.y)
+                chunk.mesh.set_edited(voxel_index)
+                self.remesh_scheduler.add(chunk)
 
                 # was it an empty chunk
                 if chunk.is_empty:
@@ -35,8 +44,9 @@ class VoxelHandler:
 
     def rebuild_adj_chunk(self, adj_voxel_pos):
         index = get_chunk_index(adj_voxel_pos)
-        if index != -1:
-            self.chunks[index].mesh.rebuild()
+        if index != -1 and self.chunks[index].mesh:
+            self.chunks[index].mesh.set_dirty(adj_voxel_pos[1] % CHUNK_SIZE)
+            self.remesh_scheduler.add(self.chunks[index])
 
     def rebuild_adjacent_chunks(self):
         lx, ly, lz = self.voxel_local_pos
@@ -59,9 +69,12 @@ class VoxelHandler:
 
     def remove_voxel(self):
         if self.voxel_id:
-            self.chunk.voxels[self.voxel_index] = 0
+            self.voxels.set_voxel(self.chunk.index, self.voxel_index, 0)
+            self.chunk.is_modified = True
 
-            self.chunk.mesh.rebuild()
+            self.chunk.mesh.set_dirty(self.voxel_local_pos.y)
+            self.chunk.mesh.set_edited(self.voxel_index)
+            self.remesh_scheduler.add(self.chunk)
             self.rebuild_adjacent_chunks()
 
     def set_voxel(self):
@@ -78,73 +91,40 @@ class VoxelHandler:
 
     def ray_cast(self):
         # start point
-        x1, y1, z1 = self.app.player.position
+        start = np.array(self.app.player.position, dtype='float64')
         # end point
-        x2, y2, z2 = self.app.player.position + self.app.player.forward * MAX_RAY_DIST
+        end = np.array(self.app.player.position + self.app.player.forward * MAX_RAY_DIST, dtype='float64')
 
-        current_voxel_pos = glm.ivec3(x1, y1, z1)
         self.voxel_id = 0
-        self.voxel_normal = glm.ivec3(0)
-        step_dir = -1
-
-        dx = glm.sign(x2 - x1)
-        delta_x = min(dx / (x2 - x1), 10000000.0) if dx != 0 else 10000000.0
-        max_x = delta_x * (1.0 - glm.fract(x1)) if dx > 0 else delta_x * glm.fract(x1)
-
-        dy = glm.sign(y2 - y1)
-        delta_y = min(dy / (y2 - y1), 10000000.0) if dy != 0 else 10000000.0
-        max_y = delta_y * (1.0 - glm.fract(y1)) if dy > 0 else delta_y * glm.fract(y1)
-
-        dz = glm.sign(z2 - z1)
-        delta_z = min(dz / (z2 - z1), 10000000.0) if dz != 0 else 10000000.0
-        max_z = delta_z * (1.0 - glm.fract(z1)) if dz > 0 else delta_z * glm.fract(z1)
-
-        while not (max_x > 1.0 and max_y > 1.0 and max_z > 1.0):
-
-            result = self.get_voxel_id(voxel_world_pos=current_voxel_pos)
-            if result[0]:
-                self.voxel_id, self.voxel_index, self.voxel_local_pos, self.chunk = result
-                self.voxel_world_pos = current_voxel_pos
-
-                if step_dir == 0:
-                    self.voxel_normal.x = -dx
-                elif step_dir == 1:
-                    self.voxel_normal.y = -dy
-                else:
-                    self.voxel_normal.z = -dz
-                return True
-
-            if max_x < max_y:
-                if max_x < max_z:
-                    current_voxel_pos.x += dx
-                    max_x += delta_x
-                    step_dir = 0
-                else:
-                    current_voxel_pos.z += dz
-                    max_z += delta_z
-                    step_dir = 2
-            else:
-                if max_y < max_z:
-                    current_voxel_pos.y += dy
-                    max_y += delta_y
-                    step_dir = 1
-                else:
-                    current_voxel_pos.z += dz
-                    max_z += delta_z
-                    step_dir = 2
-        return False
+        if not cast_ray(start, end, self.voxels.arrays, self.table.has_mesh, self.world.origin, self.hit):
+            return False
+
+        _, x, y, z, nx, ny, nz = self.hit.tolist()
+        self.voxel_world_pos = glm.ivec3(x, y, z)
+        self.voxel_normal = glm.ivec3(nx, ny, nz)
+        self.voxel_id, self.voxel_index, self.voxel_local_pos, self.chunk = self.get_voxel_id(self.voxel_world_pos)
+        return True
+
+    def cast_rays(self, origins, directions, max_dist=MAX_RAY_DIST):
+        # ray_cast for N rays at once: origins and directions [N, 3]. Returns the hit
+        # world positions [N, 3], face normals [N, 3] and voxel ids [N], 0 for no hit
+        return cast_rays(
+            np.asarray(origins, dtype='float64'),
+            np.asarray(directions, dtype='float64'),
+            max_dist, self.voxels.arrays, self.table.has_mesh, self.world.origin
+        )
 
     def get_voxel_id(self, voxel_world_pos):
-        cx, cy, cz = chunk_pos = voxel_world_pos / CHUNK_SIZE
-
-        if 0 <= cx < WORLD_W and 0 <= cy < WORLD_H and 0 <= cz < WORLD_D:
-            chunk_index = cx + WORLD_W * cz + WORLD_AREA * cy
-            chunk = self.chunks[chunk_index]
+        cx, cy, cz = chunk_pos = voxel_world_pos // CHUNK_SIZE
+        chunk_index = get_chunk_index(tuple(voxel_world_pos))
+        chunk = self.chunks[chunk_index] if chunk_index != -1 else None
 
+        # only chunks with a mesh can be edited, the window border is generation-only
+        if chunk and chunk.mesh and chunk.position == (cx, cy, cz):
             lx, ly, lz = voxel_local_pos = voxel_world_pos - chunk_pos * CHUNK_SIZE
 
             voxel_index = lx + CHUNK_SIZE * lz + CHUNK_AREA * ly
-            voxel_id = chunk.voxels[voxel_index]
+            voxel_id = self.voxels.get_voxel(chunk.index, voxel_index)
 
             return voxel_id, voxel_index, voxel_local_pos, chunk
         return 0, 0, 0, 0
@@ -0,0 +1,169 @@
+from settings import *
+from range_allocator import RangeAllocator
+
+# bits per voxel of the chunk encodings: 0 a uniform chunk (its voxel id is palette[0]),
+# 1, 2 or 4 bit indices into the palette of the chunk, 8 dense voxel ids
+DENSE = 8
+PALETTE_SIZE = 16
+
+
+@njit(inline='always')
+def get_voxel(voxels, chunk_index, voxel_index):
+    # a voxel id of the store, voxels is VoxelStore.arrays with the palettes flattened.
+    # Inlined into the kernels reading the voxels of other chunks, is_void of the mesh
+    # builder and cast_ray, so the decoding stays in one place
+    chunk_bits = np.int64(voxels[0][chunk_index])
+    offset = voxels[1][chunk_index]
+
+    if chunk_bits == DENSE:
+        return voxels[3][offset + voxel_index]
+    if chunk_bits == 0:
+        return voxels[2][chunk_index * PALETTE_SIZE]
+
+    # log2 of the voxels per byte: 3, 2, 1 for 1, 2, 4 bits
+    shift = 3 - (chunk_bits >> 1)
+    byte = np.int64(voxels[3][offset + (voxel_index >> shift)])
+    palette_index = byte >> ((voxel_index & ((1 << shift) - 1)) * chunk_bits) & ((1 << chunk_bits) - 1)
+    return voxels[2][chunk_index * PALETTE_SIZE + palette_index]
+
+
+@njit
+def get_palette(chunk_voxels):
+    is_used = np.zeros(256, dtype=np.bool_)
+    for voxel_id in chunk_voxels:
+        is_used[voxel_id] = True
+    return np.flatnonzero(is_used).astype(np.uint8)
+
+
+@njit
+def pack_chunk(chunk_voxels, palette, bits, packed):
+    palette_indices = np.zeros(256, dtype=np.uint8)
+    for i in range(len(palette)):
+        palette_indices[palette[i]] = i
+
+    per_byte = 8 // bits
+    packed[:] = 0
+    for voxel_index in range(CHUNK_VOL):
+        palette_index = palette_indices[chunk_voxels[voxel_index]]
+        packed[voxel_index // per_byte] |= palette_index << (voxel_index % per_byte * bits)
+
+
+@njit(nogil=True)
+def unpack_chunk(packed, palette, bits, chunk_voxels):
+    per_byte = 8 // bits
+    mask = (1 << bits) - 1
+    for voxel_index in range(CHUNK_VOL):
+        byte = packed[voxel_index // per_byte]
+        chunk_voxels[voxel_index] = palette[byte >> (voxel_index % per_byte * bits) & mask]
+
+
+class VoxelStore:
+    # voxels of the chunks of the window: uniform chunks as a single voxel id, chunks with
+    # up to 16 voxel ids as bit-packed palette indices, the others and the edited chunks
+    # as dense voxel ids. The packed and dense voxels are ranges of one byte pool
+    def __init__(self, size=WORLD_VOL):
+        self.bits = np.zeros(size, dtype='uint8')
+        self.palettes = np.zeros([size, PALETTE_SIZE], dtype='uint8')
+        self.offsets = np.zeros(size, dtype='int64')
+        self.sizes = np.zeros(size, dtype='int64')
+
+        self.allocator = RangeAllocator(VOXEL_POOL_SIZE * 2 ** 20)
+        self.pool = np.empty(self.allocator.capacity, dtype='uint8')
+
+    @property
+    def arrays(self):
+        # for the njit read path, get_voxel
+        return self.bits, self.offsets, self.palettes.ravel(), self.pool
+
+    def set_chunk(self, chunk_index, chunk_voxels):
+        palette = get_palette(chunk_voxels)
+        bits = DENSE
+        for palette_bits in (0, 1, 2, 4):
+            if len(palette) <= 1 << palette_bits:
+                bits = palette_bits
+                break
+
+        self.bits[chunk_index] = bits
+        if bits != DENSE:
+            self.palettes[chunk_index, :len(palette)] = palette
+        data = self.alloc(chunk_index, CHUNK_VOL * bits // 8)
+
+        if bits == DENSE:
+            data[:] = chunk_voxels
+        elif bits:
+            pack_chunk(chunk_voxels, palette, bits, data)
+
+    def get_chunk(self, chunk_index):
+        # dense copy of the voxels of the chunk
+        if self.bits[chunk_index] == DENSE:
+            return self.get_data(chunk_index).copy()
+
+        bits = self.bits[chunk_index]
+        if bits == 0:
+            return np.full(CHUNK_VOL, self.palettes[chunk_index, 0], dtype='uint8')
+
+        chunk_voxels = np.empty(CHUNK_VOL, dtype='uint8')
+        unpack_chunk(self.get_data(chunk_index), self.palettes[chunk_index], int(bits), chunk_voxels)
+        return chunk_voxels
+
+    def get_voxel(self, chunk_index, voxel_index):
+        return get_voxel(self.arrays, chunk_index, voxel_index)
+
+    def set_voxel(self, chunk_index, voxel_index, voxel_id):
+        # edited chunks are stored densely
+        if self.bits[chunk_index] != DENSE:
+            chunk_voxels = self.get_chunk(chunk_index)
+            self.bits[chunk_index] = DENSE
+            self.alloc(chunk_index, CHUNK_VOL)[:] = chunk_voxels
+
+        self.pool[self.offsets[chunk_index] + voxel_index] = voxel_id
+
+    def is_empty(self, chunk_index):
+        return self.bits[chunk_index] == 0 and self.palettes[chunk_index, 0] == 0
+
+    def get_data(self, chunk_index):
+        offset = self.offsets[chunk_index]
+        return self.pool[offset:offset + self.sizes[chunk_index]]
+
+    def alloc(self, chunk_index, size):
+        # replaces the pool range of the chunk, returns the new range
+        if self.sizes[chunk_index]:
+            self.allocator.free(int(self.offsets[chunk_index]), int(self.sizes[chunk_index]))
+        self.offsets[chunk_index], self.sizes[chunk_index] = 0, 0
+        if not size:
+            return self.pool[:0]
+
+        offset = self.allocator.alloc(size)
+        if offset == -1:
+            self.compact(size)
+            offset = self.allocator.alloc(size)
+
+        self.offsets[chunk_index], self.sizes[chunk_index] = offset, size
+        return self.pool[offset:offset + size]
+
+    def compact(self, size):
+        # moves the ranges to the start of the pool, and grows it if there still isn't room
+        offset = 0
+        for chunk_index in np.argsort(self.offsets):
+            if self.sizes[chunk_index]:
+                data = self.get_data(chunk_index)
+                self.pool[offset:offset + len(data)] = data
+                self.offsets[chunk_index] = offset
+                offset += len(data)
+
+        capacity = self.allocator.capacity
+        if offset + size > capacity:
+            capacity = max(2 * capacity, offset + size)
+            pool = np.empty(capacity, dtype='uint8')
+            pool[:offset] = self.pool[:offset]
+            self.pool = pool
+        self.allocator.reset(capacity, offset)
+
+    def get_stats(self):
+        # memory in MB and the number of chunks of each encoding
+        return {
+            'dense_size': len(self.bits) * CHUNK_VOL / 2 ** 20,
+            'pool_size': len(self.pool) / 2 ** 20,
+            'pool_used': self.allocator.used / 2 ** 20,
+            **{f'{bits}_bit_chunks': int(np.count_nonzero(self.bits == bits)) for bits in (0, 1, 2, 4, 8)},
+        }
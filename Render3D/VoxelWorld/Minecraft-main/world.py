@@ -1,39 +1,233 @@
 from settings import *
 from world_objects.chunk import Chunk
 from voxel_handler import VoxelHandler
+from terrain_gen import generate_chunks
+from heightmaps import HeightMaps
+from remesh_scheduler import RemeshScheduler
+from meshes.chunk_arena import ChunkArena
+from meshes.mesh_cache import MeshCache
+from meshes.batch_mesher import BatchMesher
+from chunk_table import ChunkTable
+from occlusion import get_reachable_chunks
+from voxel_store import VoxelStore
+from regions import Regions
+from autosave import AutoSave
 
 
 class World:
     def __init__(self, app):
         self.app = app
+        # chunks and voxels are ring buffers wrapping around the streamed window,
+        # so the memory stays the same no matter how far the player travels
         self.chunks = [None for _ in range(WORLD_VOL)]
-        self.voxels = np.empty([WORLD_VOL, CHUNK_VOL], dtype='uint8')
+        self.voxels = VoxelStore()
+        self.chunk_table = ChunkTable()
+        self.heightmaps = HeightMaps()
+        self.regions = Regions()
+        self.autosave = AutoSave(self)
+        self.place_player()
+
+        # chunk x, z of the window corner
+        self.origin = self.get_origin()
+        self.load_queue = []
+        self.mesh_queue = []
+        # drawable chunks on the frustum skipped by the occlusion culling in the last frame
+        self.num_occluded = 0
+
+        self.chunk_arena = ChunkArena(app)
+        self.mesh_cache = MeshCache(dtype=self.chunk_arena.dtype) if MESH_CACHE else None
+        self.batch_mesher = BatchMesher(self)
         self.build_chunks()
         self.build_chunk_mesh()
+        # with a fast start the rest of the window is streamed in while loading, nearest first
+        self.queue_chunks()
+        self.num_loading = len(self.load_queue) + len(self.mesh_queue)
+        self.remesh_scheduler = RemeshScheduler(self)
         self.voxel_handler = VoxelHandler(self)
 
     def update(self):
+        self.stream_chunks()
+        self.remesh_scheduler.update()
+        self.autosave.update()
         self.voxel_handler.update()
 
+    def place_player(self):
+        # never spawn inside the terrain
+        position = self.app.player.position
+        ground_y = self.heightmaps.get_height(int(position.x), int(position.z))
+        position.y = max(position.y, ground_y + PLAYER_SPAWN_HEIGHT)
+
+    def get_origin(self):
+        x, _, z = self.app.player.position
+        ox = int(x // CHUNK_SIZE) - WORLD_W // 2
+        oz = int(z // CHUNK_SIZE) - WORLD_D // 2
+        return ox, oz
+
+    def get_chunk_position(self, chunk_index):
+        # position of the window chunk stored in the ring buffer at chunk_index
+        x = chunk_index % WORLD_W
+        z = chunk_index // WORLD_W % WORLD_D
+        y = chunk_index // WORLD_AREA
+
+        ox, oz = self.origin
+        return ox + (x - ox) % WORLD_W, y, oz + (z - oz) % WORLD_D
+
+    def is_inner_chunk(self, position):
+        # border chunks of the window are only generated, so that every
+        # meshed chunk has all of its neighbours loaded
+        cx, _, cz = position
+        ox, oz = self.origin
+        return ox < cx < ox + WORLD_W - 1 and oz < cz < oz + WORLD_D - 1
+
+    def is_start_chunk(self, position, border=0):
+        # chunks built before the first frame, border adds the rings of their neighbours
+        if not FAST_START:
+            return True
+        cx, _, cz = position
+        ox, oz = self.origin
+        return max(abs(cx - ox - WORLD_W // 2), abs(cz - oz - WORLD_D // 2)) <= FAST_START_RADIUS + border
+
+    def get_loading_progress(self):
+        # share of the chunks queued at the start that are built, 1 once the window is loaded
+        if not self.num_loading:
+            return 1.0
+        return max(1 - (len(self.load_queue) + len(self.mesh_queue)) / self.num_loading, 0.0)
+
+    def stream_chunks(self):
+        origin = self.get_origin()
+        if origin != self.origin:
+            self.origin = origin
+            self.move_chunks()
+
+        budget = LOADING_BUDGET if self.num_loading else CHUNK_LOAD_BUDGET
+        # all voxels must be generated before the neighbouring chunks get meshed
+        if self.load_queue:
+            self.build_voxels(self.load_queue[-budget:])
+            del self.load_queue[-budget:]
+            return
+
+        chunk_indices = []
+        for _ in range(min(budget, len(self.mesh_queue))):
+            chunk = self.mesh_queue.pop()
+            if self.is_inner_chunk(chunk.position) and self.needs_mesh(chunk):
+                chunk_indices.append(chunk.index)
+        self.batch_mesher.build_meshes(chunk_indices)
+
+        if not self.mesh_queue:
+            self.num_loading = 0
+
+    def move_chunks(self):
+        positions = [self.get_chunk_position(chunk_index) for chunk_index in range(WORLD_VOL)]
+        # edited chunks leaving the window are saved before their voxels are replaced
+        self.autosave.save(
+            [chunk for chunk, position in zip(self.chunks, positions) if chunk.position != position]
+        )
+
+        for chunk, position in zip(self.chunks, positions):
+            if chunk.position != position:
+                chunk.move(position)
+
+            elif chunk.mesh and not self.is_inner_chunk(position):
+                chunk.release_mesh()
+
+        self.queue_chunks()
+
+    def queue_chunks(self):
+        self.load_queue = self.sort_by_distance(
+            [chunk for chunk in self.chunks if not chunk.is_loaded]
+        )
+        # new chunks, and the chunks whose level of detail changed
+        self.mesh_queue = self.sort_by_distance(
+            [chunk for chunk in self.chunks
+             if self.is_inner_chunk(chunk.position) and self.needs_mesh(chunk)]
+        )
+
+    def get_lod(self, position):
+        # level of detail of the chunk mesh, from the horizontal distance in chunks
+        # to the player, so the chunks of a column share it
+        cx, _, cz = position
+        ox, oz = self.origin
+        distance = math.hypot(cx - ox - WORLD_W // 2, cz - oz - WORLD_D // 2)
+        return sum(distance >= lod_distance for lod_distance in LOD_DISTANCES)
+
+    def needs_mesh(self, chunk):
+        return chunk.mesh is None or chunk.mesh.lod != self.get_lod(chunk.position)
+
+    def sort_by_distance(self, chunks):
+        # the nearest chunk is at the end of the queue
+        position = self.app.player.position
+        return sorted(chunks, key=lambda chunk: glm.distance2(chunk.center, position), reverse=True)
+
     def build_chunks(self):
-        for x in range(WORLD_W):
-            for y in range(WORLD_H):
-                for z in range(WORLD_D):
-                    chunk = Chunk(self, position=(x, y, z))
+        for chunk_index in range(WORLD_VOL):
+            position = self.get_chunk_position(chunk_index)
+            self.chunks[chunk_index] = Chunk(self, position, chunk_index)
+
+        self.build_voxels([chunk for chunk in self.chunks if self.is_start_chunk(chunk.position, border=1)])
 
-                    chunk_index = x + WORLD_W * z + WORLD_AREA * y
-                    self.chunks[chunk_index] = chunk
+    def build_voxels(self, chunks, batch_size=64):
+        # saved chunks are read from the region files, the terrain of the others is generated
+        # in parallel calls of batch_size chunks into a dense scratch buffer and saved
+        missing = []
+        for chunk in chunks:
+            chunk_voxels = self.autosave.get_pending(chunk.position)
+            if chunk_voxels is None:
+                chunk_voxels = self.regions.load_chunk(chunk.position)
+            if chunk_voxels is None:
+                missing.append(chunk)
+            else:
+                self.set_chunk_voxels(chunk, chunk_voxels)
 
-                    # put the chunk voxels in a separate array
-                    self.voxels[chunk_index] = chunk.build_voxels()
+        for i in range(0, len(missing), batch_size):
+            self.generate_voxels(missing[i:i + batch_size])
 
-                    # get pointer to voxels
-                    chunk.voxels = self.voxels[chunk_index]
+    def generate_voxels(self, chunks):
+        chunk_indices = np.arange(len(chunks))
+        chunk_positions = np.array([chunk.position for chunk in chunks])
+
+        # chunks of the same column share its heightmap
+        columns = list(dict.fromkeys((cx, cz) for cx, _, cz in chunk_positions.tolist()))
+        column_indices = {column: i for i, column in enumerate(columns)}
+        heightmaps = np.array(self.heightmaps.get_heightmaps(columns))
+        heightmap_indices = np.array([column_indices[cx, cz] for cx, _, cz in chunk_positions.tolist()])
+
+        voxels = np.empty([len(chunks), CHUNK_VOL], dtype='uint8')
+        generate_chunks(voxels, chunk_indices, chunk_positions, heightmaps, heightmap_indices)
+
+        for chunk, chunk_voxels in zip(chunks, voxels):
+            self.regions.save_chunk(chunk.position, chunk_voxels)
+            self.set_chunk_voxels(chunk, chunk_voxels)
+
+    def set_chunk_voxels(self, chunk, chunk_voxels):
+        # the voxels are compressed into the voxel store
+        self.voxels.set_chunk(chunk.index, chunk_voxels)
+        chunk.is_empty = self.voxels.is_empty(chunk.index)
+        chunk.is_loaded = True
+
+    def save(self):
+        # on exit. Generated chunks are saved right away, edited ones by the autosave
+        self.autosave.close()
+        self.regions.flush()
 
     def build_chunk_mesh(self):
-        for chunk in self.chunks:
-            chunk.build_mesh()
+        self.batch_mesher.build_meshes([
+            chunk.index for chunk in self.chunks
+            if self.is_inner_chunk(chunk.position) and self.is_start_chunk(chunk.position)
+        ])
 
     def render(self):
-        for chunk in self.chunks:
-            chunk.render()
+        # the visible chunks are culled in one pass over the chunk table and drawn in one batch
+        table = self.chunk_table
+        on_frustum = self.app.player.frustum.get_on_frustum(table.centers)
+        is_visible = on_frustum & table.get_drawable()
+
+        if OCCLUSION_CULLING:
+            camera_chunk = tuple(int(x // CHUNK_SIZE) for x in self.app.player.position)
+            is_reachable = get_reachable_chunks(table.connections, on_frustum, camera_chunk, self.origin)
+            self.num_occluded = np.count_nonzero(is_visible & ~is_reachable)
+            is_visible &= is_reachable
+
+        chunk_indices = np.flatnonzero(is_visible)
+        self.chunk_arena.render(
+            table.firsts[chunk_indices], table.num_vertices[chunk_indices], table.origins[chunk_indices]
+        )
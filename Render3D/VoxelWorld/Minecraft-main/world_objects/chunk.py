@@ -1,57 +1,51 @@
 from settings import *
 from meshes.chunk_mesh import ChunkMesh
-import random
-from terrain_gen import *
 
 
 class Chunk:
-    def __init__(self, world, position):
+    def __init__(self, world, position, index):
         self.app = world.app
         self.world = world
+        self.table = world.chunk_table
         self.position = position
-        self.m_model = self.get_model_matrix()
-        self.voxels: np.array = None
+        self.index = index
         self.mesh: ChunkMesh = None
         self.is_empty = True
+        self.is_loaded = False
+        self.is_modified = False  # edited since it was saved
 
         self.center = (glm.vec3(self.position) + 0.5) * CHUNK_SIZE
-        self.is_on_frustum = self.app.player.frustum.is_on_frustum
-
-    def get_model_matrix(self):
-        m_model = glm.translate(glm.mat4(), glm.vec3(self.position) * CHUNK_SIZE)
-        return m_model
-
-    def set_uniform(self):
-        self.mesh.program['m_model'].write(self.m_model)
-
-    def build_mesh(self):
-        self.mesh = ChunkMesh(self)
-
-    def render(self):
-        if not self.is_empty and self.is_on_frustum(self):
-            self.set_uniform()
-            self.mesh.render()
-
-    def build_voxels(self):
-        voxels = np.zeros(CHUNK_VOL, dtype='uint8')
-
-        cx, cy, cz = glm.ivec3(self.position) * CHUNK_SIZE
-        self.generate_terrain(voxels, cx, cy, cz)
-
-        if np.any(voxels):
-            self.is_empty = False
-        return voxels
-
-    @staticmethod
-    @njit
-    def generate_terrain(voxels, cx, cy, cz):
-        for x in range(CHUNK_SIZE):
-            wx = x + cx
-            for z in range(CHUNK_SIZE):
-                wz = z + cz
-                world_height = get_height(wx, wz)
-                local_height = min(world_height - cy, CHUNK_SIZE)
-
-                for y in range(local_height):
-                    wy = y + cy
-                    set_voxel_id(voxels, x, y, z, wx, wy, wz, world_height)
+        self.table.set_position(index, position)
+
+    @property
+    def is_empty(self):
+        return self.table.is_empty[self.index]
+
+    @is_empty.setter
+    def is_empty(self, is_empty):
+        self.table.is_empty[self.index] = is_empty
+
+    def get_voxels(self):
+        # dense copy of the voxels, they are stored compressed in the voxel store
+        return self.world.voxels.get_chunk(self.index)
+
+    def move(self, position):
+        # reuse the chunk for a new position of the streamed window
+        self.position = position
+        self.center = (glm.vec3(self.position) + 0.5) * CHUNK_SIZE
+        self.table.set_position(self.index, position)
+        self.release_mesh()
+        self.is_empty = True
+        self.is_loaded = False
+
+    def set_mesh(self, mesh):
+        # a mesh of the batch mesher, built after release_mesh
+        self.mesh = mesh
+        self.table.has_mesh[self.index] = True
+
+    def release_mesh(self):
+        # gives the range of the mesh back to the chunk arena
+        if self.mesh:
+            self.mesh.release()
+            self.mesh = None
+        self.table.has_mesh[self.index] = False